@@ -0,0 +1,94 @@
+"""
+Gunicorn production profile.
+
+Workers and threads are sized from the CPU count and the memory limit of
+the container, the app is preloaded in the master so Django, ckeditor and
+cloudinary are imported once and shared copy-on-write, and workers are
+recycled after a jittered number of requests. Every value can be
+overridden from the environment.
+"""
+
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _memory_limit_mb():
+    """Container memory limit (cgroup v2/v1) or total RAM, in MB"""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+def _default_workers():
+    by_cpu = multiprocessing.cpu_count() * 2 + 1
+    memory = _memory_limit_mb()
+    if memory is None:
+        return by_cpu
+    by_memory = max(1, memory // _env_int('GUNICORN_WORKER_MEMORY_MB', 150))
+    return max(1, min(by_cpu, by_memory))
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = _env_int('WEB_CONCURRENCY', _default_workers())
+threads = _env_int('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1)
+
+# Import the app once in the master; workers share its memory copy-on-write
+preload_app = True
+
+# Recycle workers to contain slow leaks; the jitter keeps them from all
+# restarting at the same moment
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', max(1, max_requests // 10))
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def when_ready(server):
+    # With preload_app the Django app is already imported here, before any fork
+    from portfolio.warmup import close_connections, warm_shared
+
+    warm_shared()
+    close_connections()
+    server.log.info(
+        'Warmed templates and URL resolver; starting %s %s worker(s) x %s thread(s)',
+        workers, worker_class, threads,
+    )
+
+
+def post_fork(server, worker):
+    from portfolio.warmup import close_connections
+
+    close_connections()
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's counters and drop its metrics file
+    from portfolio.metrics import archive_worker
+
+    archive_worker(worker.pid)
@@ -1,8 +1,21 @@
+import json
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
 from django import forms
-from django.db import models  # ← ADD THIS LINE
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.db import connections
+from django.db.models import Count, Q
+from django.urls import path
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from .models import Profile, Skill, Project, ProjectContent, Education, Experience, ContactMessage
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_POST
+from .models import Profile, Skill, Project, ProjectContent, Education, Experience, ContactMessage, RequestProfile, LinkCheck, PendingFileDeletion
+from . import ordering
 from ckeditor_uploader.widgets import CKEditorUploadingWidget
 
 
@@ -33,7 +46,8 @@ class ProjectContentInline(admin.StackedInline):
         'quote_text', 
         'quote_author', 
         'code_content', 
-        'code_language'
+        'code_language',
+        'markdown_source',
     ]
     
     class Media:
@@ -43,9 +57,75 @@ class ProjectContentInline(admin.StackedInline):
         js = ('admin/js/custom_admin.js',)
 
 
+class PortfolioAdminMixin:
+    """Default new rows to the portfolio served on the admin's host"""
+    
+    def get_changeform_initial_data(self, request):
+        initial = super().get_changeform_initial_data(request)
+        tenant = getattr(request, 'tenant', None)
+        if tenant is not None:
+            initial.setdefault('profile', tenant.pk)
+        return initial
+
+
+def estimated_count(queryset):
+    """Planner row estimate for ``queryset``'s table on PostgreSQL, else None"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been vacuumed or analyzed
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that skips COUNT(*) on large unfiltered tables.
+
+    Unfiltered lists use the planner's estimate when it is at least
+    ADMIN_ESTIMATED_COUNT_THRESHOLD rows. Filtered lists, smaller tables
+    and databases without an estimate are counted exactly.
+    """
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LightweightChangeList(ChangeList):
+    """Changelist that leaves the model admin's ``changelist_defer`` columns in the database"""
+    
+    def get_results(self, request):
+        # Only the displayed page skips them; actions and list_editable saves load whole rows
+        self.queryset = self.queryset.defer(*self.model_admin.changelist_defer)
+        super().get_results(request)
+
+
+class LightweightChangeListMixin:
+    """Changelist settings for tables that grow to 100k+ rows"""
+    changelist_defer = ()
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered COUNT(*) behind "N total"
+    show_full_result_count = False
+    
+    def get_changelist(self, request, **kwargs):
+        return LightweightChangeList
+
+
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ['name', 'title', 'email']
+    list_display = ['name', 'title', 'email', 'domain']
+    search_fields = ['name', 'domain']
     fieldsets = (
         ('Personal Information', {
             'fields': ('name', 'title', 'bio', 'profile_image')
@@ -56,27 +136,40 @@ class ProfileAdmin(admin.ModelAdmin):
         ('Resume', {
             'fields': ('cv_url',)
         }),
+        ('Site', {
+            'fields': ('domain',),
+            'description': 'Each portfolio is served on its own domain, which must also be in ALLOWED_HOSTS'
+        }),
     )
-    
-    def has_add_permission(self, request):
-        # Only allow one profile
-        if Profile.objects.exists():
-            return False
-        return True
 
 
 @admin.register(Skill)
-class SkillAdmin(admin.ModelAdmin):
+class SkillAdmin(PortfolioAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'category', 'proficiency']
-    list_filter = ['category']
+    list_filter = ['profile', 'category']
     search_fields = ['name']
     list_editable = ['proficiency']
 
 
+class BrokenLinksFilter(admin.SimpleListFilter):
+    title = 'link health'
+    parameter_name = 'links'
+    
+    def lookups(self, request, model_admin):
+        return [('broken', 'Has broken links'), ('ok', 'All links OK')]
+    
+    def queryset(self, request, queryset):
+        if self.value() == 'broken':
+            return queryset.filter(broken_links__gt=0)
+        if self.value() == 'ok':
+            return queryset.filter(broken_links=0)
+        return queryset
+
+
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
-    list_display = ['title', 'is_featured', 'order', 'content_count', 'created_at']
-    list_filter = ['is_featured', 'created_at']
+class ProjectAdmin(PortfolioAdminMixin, admin.ModelAdmin):
+    list_display = ['title', 'is_featured', 'order', 'content_count', 'link_health', 'created_at']
+    list_filter = ['profile', 'is_featured', BrokenLinksFilter, 'created_at']
     search_fields = ['title', 'short_description']
     prepopulated_fields = {'slug': ('title',)}
     inlines = [ProjectContentInline]
@@ -84,7 +177,7 @@ class ProjectAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Basic Information', {
-            'fields': ('title', 'slug', 'short_description', 'featured_image'),
+            'fields': ('profile', 'title', 'slug', 'short_description', 'featured_image'),
             'description': 'Main project information'
         }),
         ('Technical Details', {
@@ -108,14 +201,70 @@ class ProjectAdmin(admin.ModelAdmin):
             return format_html('<span style="color: #999;">No content</span>')
         return format_html('<span style="color: #417690; font-weight: bold;">{} blocks</span>', count)
     content_count.short_description = 'Content Blocks'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            broken_links=Count('link_checks', filter=Q(link_checks__ok=False), distinct=True),
+        )
+    
+    def link_health(self, obj):
+        """Broken links found by the last check_links run"""
+        if obj.broken_links:
+            return format_html(
+                '<a href="/admin/portfolio/linkcheck/?ok__exact=0&amp;projects__id__exact={}" '
+                'style="color: #ba2121; font-weight: bold;">{} broken</a>',
+                obj.pk, obj.broken_links,
+            )
+        return format_html('<span style="color: #999;">OK</span>')
+    link_health.short_description = 'Links'
+    link_health.admin_order_field = 'broken_links'
+    
+    def save_formset(self, request, form, formset, change):
+        """Append new content blocks after the existing ones unless an order was typed in"""
+        if formset.model is not ProjectContent:
+            return super().save_formset(request, form, formset, change)
+        blocks = formset.save(commit=False)
+        for obj in formset.deleted_objects:
+            obj.delete()
+        for block in blocks:
+            block_form = next(f for f in formset.forms if f.instance is block)
+            if block.pk is None and 'order' not in block_form.changed_data:
+                block.order = ordering.next_order(form.instance)
+            block.save()
+        formset.save_m2m()
+    
+    def get_urls(self):
+        urls = [
+            path(
+                '<path:object_id>/reorder-content/',
+                self.admin_site.admin_view(self.reorder_content_view),
+                name='portfolio_project_reorder_content',
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    @method_decorator(require_POST)
+    def reorder_content_view(self, request, object_id):
+        """Apply a drag-and-drop order from the content inline in one bulk UPDATE"""
+        project = get_object_or_404(Project, pk=object_id)
+        if not self.has_change_permission(request, project):
+            return JsonResponse({'error': 'Permission denied'}, status=403)
+        try:
+            block_ids = json.loads(request.body or b'{}').get('blocks', [])
+            orders = ordering.apply_order(project, block_ids)
+        except (ValueError, TypeError, AttributeError) as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+        return JsonResponse({'orders': {str(pk): order for pk, order in orders.items()}})
 
 
 @admin.register(ProjectContent)
-class ProjectContentAdmin(admin.ModelAdmin):
+class ProjectContentAdmin(LightweightChangeListMixin, admin.ModelAdmin):
     list_display = ['get_project_title', 'content_type', 'order', 'preview', 'created_date']
     list_filter = ['content_type', 'project']
+    list_select_related = ['project']
+    changelist_defer = ['text_content', 'quote_text', 'code_content', 'markdown_source', 'markdown_html', 'markdown_toc']
     list_editable = ['order']
-    search_fields = ['project__title', 'text_content', 'quote_text']
+    search_fields = ['project__title', 'text_content', 'quote_text', 'markdown_source']
     ordering = ['project', 'order']
     
     fieldsets = (
@@ -143,6 +292,11 @@ class ProjectContentAdmin(admin.ModelAdmin):
             'classes': ('collapse',),
             'description': 'For "code" content type'
         }),
+        ('Markdown Content', {
+            'fields': ('markdown_source',),
+            'classes': ('collapse',),
+            'description': 'For "markdown" content type. Compiled to HTML with a table of contents on save'
+        }),
     )
     
     def get_project_title(self, obj):
@@ -156,22 +310,10 @@ class ProjectContentAdmin(admin.ModelAdmin):
     get_project_title.admin_order_field = 'project__title'
     
     def preview(self, obj):
-        """Show content preview"""
-        if obj.content_type == 'text':
-            # Strip HTML tags and truncate
-            import re
-            text = re.sub('<[^<]+?>', '', obj.text_content or '')
-            return text[:100] + '...' if len(text) > 100 else text
-        elif obj.content_type == 'image':
-            if obj.image:
-                return format_html('<img src="{}" style="max-height: 50px; max-width: 100px; border-radius: 4px;" />', obj.image.url)
-            return obj.image_caption or 'No image'
-        elif obj.content_type == 'quote':
-            text = obj.quote_text or ''
-            return f'"{text[:80]}..."' if len(text) > 80 else f'"{text}"'
-        elif obj.content_type == 'code':
-            return f'{obj.code_language or "Code"}'
-        return '-'
+        """Show the content preview stored on save"""
+        if obj.content_type == 'image' and obj.image:
+            return format_html('<img src="{}" style="max-height: 50px; max-width: 100px; border-radius: 4px;" />', obj.image.url)
+        return obj.preview or '-'
     preview.short_description = 'Preview'
     
     def created_date(self, obj):
@@ -187,8 +329,9 @@ class ProjectContentAdmin(admin.ModelAdmin):
         """Duplicate selected content blocks"""
         count = 0
         for content in queryset:
+            original = ProjectContent.objects.get(pk=content.pk)
             content.pk = None
-            content.order = content.project.content_blocks.count()
+            ordering.insert_after(content, original)
             content.save()
             count += 1
         self.message_user(request, f'{count} content block(s) duplicated.')
@@ -196,43 +339,120 @@ class ProjectContentAdmin(admin.ModelAdmin):
     
     def move_to_top(self, request, queryset):
         """Move selected content to top"""
-        for content in queryset:
-            content.order = -1
-            content.save()
-        self.message_user(request, 'Moved to top.')
+        count = ordering.move_blocks(queryset, to_top=True)
+        self.message_user(request, f'{count} content block(s) moved to top.')
     move_to_top.short_description = 'Move to top'
     
     def move_to_bottom(self, request, queryset):
         """Move selected content to bottom"""
-        for content in queryset:
-            max_order = content.project.content_blocks.aggregate(models.Max('order'))['order__max'] or 0
-            content.order = max_order + 1
-            content.save()
-        self.message_user(request, 'Moved to bottom.')
+        count = ordering.move_blocks(queryset, to_top=False)
+        self.message_user(request, f'{count} content block(s) moved to bottom.')
     move_to_bottom.short_description = 'Move to bottom'
 
 
 @admin.register(Education)
-class EducationAdmin(admin.ModelAdmin):
+class EducationAdmin(PortfolioAdminMixin, admin.ModelAdmin):
     list_display = ['degree', 'institution', 'start_date', 'end_date', 'is_current']
-    list_filter = ['is_current']
+    list_filter = ['profile', 'is_current']
     list_editable = ['is_current']
 
 
 @admin.register(Experience)
-class ExperienceAdmin(admin.ModelAdmin):
+class ExperienceAdmin(PortfolioAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'company', 'start_date', 'end_date', 'is_current']
-    list_filter = ['is_current']
+    list_filter = ['profile', 'is_current']
     list_editable = ['is_current']
 
 
 @admin.register(ContactMessage)
-class ContactMessageAdmin(admin.ModelAdmin):
+class ContactMessageAdmin(LightweightChangeListMixin, admin.ModelAdmin):
     list_display = ['name', 'email', 'subject', 'created_at', 'is_read']
-    list_filter = ['is_read', 'created_at']
+    changelist_defer = ['message']
+    list_filter = ['profile', 'is_read', 'created_at']
     search_fields = ['name', 'email', 'subject', 'message']
-    readonly_fields = ['name', 'email', 'subject', 'message', 'created_at']
+    readonly_fields = ['profile', 'name', 'email', 'subject', 'message', 'created_at']
     list_editable = ['is_read']
     
     def has_add_permission(self, request):
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(LinkCheck)
+class LinkCheckAdmin(admin.ModelAdmin):
+    list_display = ['url', 'ok', 'status_code', 'error', 'response_ms', 'checked_at']
+    list_filter = ['ok', 'status_code', 'projects']
+    search_fields = ['url']
+    readonly_fields = ['url', 'projects', 'status_code', 'ok', 'error', 'response_ms', 'checked_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PendingFileDeletion)
+class PendingFileDeletionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'reason', 'source', 'attempts', 'next_attempt_at', 'last_error']
+    list_filter = ['reason', 'source', 'attempts']
+    search_fields = ['name']
+    readonly_fields = ['name', 'source', 'reason', 'attempts', 'last_error', 'created_at', 'next_attempt_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'method', 'path', 'route', 'status_code', 'duration', 'trigger', 'mode']
+    list_filter = ['trigger', 'mode', 'route', 'status_code']
+    search_fields = ['path', 'username']
+    fields = ['created_at', 'method', 'path', 'route', 'status_code', 'duration_ms', 'trigger', 'mode',
+              'username', 'summary_display', 'stacks_display']
+    readonly_fields = fields
+    
+    def duration(self, obj):
+        return f'{obj.duration_ms:.1f} ms'
+    duration.short_description = 'Duration'
+    duration.admin_order_field = 'duration_ms'
+    
+    def summary_display(self, obj):
+        return format_html('<pre style="white-space: pre; overflow: auto;">{}</pre>', obj.summary)
+    summary_display.short_description = 'Top functions'
+    
+    def stacks_display(self, obj):
+        """Hottest stacks plus a download link for flamegraph tools"""
+        if not obj.collapsed_stacks:
+            return 'No stack samples (cProfile mode)'
+        top = '\n'.join(obj.collapsed_stacks.splitlines()[:20])
+        return format_html(
+            '<p><a href="../collapsed/">Download collapsed stacks</a> '
+            '(open with speedscope.app or flamegraph.pl)</p>'
+            '<pre style="white-space: pre; overflow: auto; max-height: 400px;">{}</pre>',
+            top,
+        )
+    stacks_display.short_description = 'Collapsed stacks'
+    
+    def get_urls(self):
+        urls = [
+            path(
+                '<path:object_id>/collapsed/',
+                self.admin_site.admin_view(self.collapsed_view),
+                name='portfolio_requestprofile_collapsed',
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def collapsed_view(self, request, object_id):
+        profile = get_object_or_404(RequestProfile, pk=object_id)
+        if not self.has_view_permission(request, profile):
+            return HttpResponse(status=403)
+        response = HttpResponse(profile.collapsed_stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}.collapsed"'
+        return response
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
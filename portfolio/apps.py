@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class PortfolioConfig(AppConfig):
+    name = 'portfolio'
+    
+    def ready(self):
+        from . import cleanup, purge, related
+        
+        purge.connect_signals()
+        related.connect_signals()
+        cleanup.connect_signals()
@@ -0,0 +1,250 @@
+"""
+Deferred deletion of media files.
+
+When a saved model replaces a file, or a model holding files is deleted,
+the old names are recorded as PendingFileDeletion rows in the same
+transaction. Nothing talks to the storage during the request. The
+``delete_pending_files`` command later removes them in batches. On
+Cloudinary it uses the bulk delete API (100 files per call); on other
+storages it deletes one file at a time. Failures are retried with
+exponential backoff; queueing a name again resets its attempts. A file
+is only deleted once no FileField in the project references it any more,
+so copies shared by duplicated content blocks survive.
+
+``scan_orphans`` lists files under the ``upload_to`` directories of every
+FileField that no row references, for ``scan_orphan_files`` to queue.
+"""
+
+import datetime
+import logging
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CLOUDINARY_BATCH = 100
+RETRY_BASE_SECONDS = 60
+
+
+def file_fields():
+    """``(model, field)`` for every concrete FileField of every installed model"""
+    return [
+        (model, field)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+
+
+def _label(model, field):
+    return f'{model._meta.label}.{field.name}'
+
+
+# ---------------------------------------------------------------------------
+# Queueing
+# ---------------------------------------------------------------------------
+
+def enqueue(entries, reason):
+    """Queue ``(name, source)`` pairs; a name already queued starts over with fresh attempts"""
+    from .models import PendingFileDeletion
+
+    now = timezone.now()
+    # One upsert can't touch a row twice, so each name goes in once
+    rows = {
+        name: PendingFileDeletion(name=name, source=source, reason=reason, next_attempt_at=now)
+        for name, source in entries if name
+    }
+    if rows:
+        PendingFileDeletion.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=['name'],
+            # Re-queueing revives rows that ran out of attempts
+            update_fields=['source', 'reason', 'attempts', 'last_error', 'next_attempt_at'],
+        )
+
+
+def _fields_of(sender):
+    return [field for field in sender._meta.concrete_fields if isinstance(field, models.FileField)]
+
+
+def remember_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Read the file names currently stored for ``instance`` before it is overwritten"""
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    fields = [
+        field for field in _fields_of(sender)
+        if update_fields is None or field.name in update_fields
+    ]
+    if not fields:
+        return
+    stored = sender._base_manager.filter(pk=instance.pk).values(*[field.attname for field in fields]).first()
+    instance._stored_files = stored or {}
+
+
+def queue_replaced(sender, instance, created, raw=False, **kwargs):
+    stored = instance.__dict__.pop('_stored_files', None)
+    if raw or created or not stored:
+        return
+    replaced = []
+    for field in _fields_of(sender):
+        if field.attname not in stored:
+            continue
+        old = stored[field.attname]
+        new = getattr(instance, field.attname)
+        new = new.name if new else ''
+        if old and old != new and old != field.get_default():
+            replaced.append((old, _label(sender, field)))
+    enqueue(replaced, 'replaced')
+
+
+def queue_deleted(sender, instance, **kwargs):
+    entries = []
+    for field in _fields_of(sender):
+        file = getattr(instance, field.attname)
+        if file and file.name != field.get_default():
+            entries.append((file.name, _label(sender, field)))
+    enqueue(entries, 'deleted')
+
+
+def connect_signals():
+    for model in {model for model, _ in file_fields()}:
+        uid = f'deferred-cleanup-{model._meta.label_lower}'
+        pre_save.connect(remember_files, sender=model, dispatch_uid=uid)
+        post_save.connect(queue_replaced, sender=model, dispatch_uid=uid)
+        post_delete.connect(queue_deleted, sender=model, dispatch_uid=uid)
+
+
+# ---------------------------------------------------------------------------
+# Deleting
+# ---------------------------------------------------------------------------
+
+def referenced_names(names):
+    """The subset of ``names`` still stored in some FileField"""
+    names = list(names)
+    found = set()
+    for model, field in file_fields():
+        found.update(
+            model._base_manager.filter(**{f'{field.attname}__in': names}).values_list(field.attname, flat=True)
+        )
+    return found
+
+
+def _is_cloudinary(storage):
+    from cloudinary_storage.storage import MediaCloudinaryStorage
+
+    return isinstance(storage, MediaCloudinaryStorage)
+
+
+def delete_from_storage(names, storage=default_storage):
+    """Delete ``names``; returns ``{name: error}`` for the ones that failed"""
+    errors = {}
+    if _is_cloudinary(storage):
+        import cloudinary.api
+
+        resource_type = storage._get_resource_type('')
+        for start in range(0, len(names), CLOUDINARY_BATCH):
+            chunk = names[start:start + CLOUDINARY_BATCH]
+            try:
+                response = cloudinary.api.delete_resources(
+                    chunk, resource_type=resource_type, type='upload', invalidate=True,
+                )
+            except Exception as exc:
+                errors.update((name, str(exc) or exc.__class__.__name__) for name in chunk)
+                continue
+            for name in chunk:
+                status = response.get('deleted', {}).get(name)
+                if status not in ('deleted', 'not_found'):
+                    errors[name] = f'Cloudinary returned {status!r}'
+        return errors
+
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception as exc:
+            errors[name] = str(exc) or exc.__class__.__name__
+    return errors
+
+
+def process_batch(batch_size=100, max_attempts=5, dry_run=False):
+    """
+    Delete one batch of due files.
+
+    Returns ``(deleted, kept, failed)``: files removed from storage, rows
+    dropped because the file is referenced again, and rows rescheduled.
+    """
+    from .models import PendingFileDeletion
+
+    now = timezone.now()
+    batch = list(
+        PendingFileDeletion.objects.filter(next_attempt_at__lte=now, attempts__lt=max_attempts)
+        .order_by('next_attempt_at', 'pk')[:batch_size]
+    )
+    if not batch:
+        return 0, 0, 0
+
+    still_used = referenced_names(row.name for row in batch)
+    kept = [row for row in batch if row.name in still_used]
+    due = [row for row in batch if row.name not in still_used]
+    if dry_run:
+        return len(due), len(kept), 0
+
+    errors = delete_from_storage([row.name for row in due])
+    failed = []
+    for row in due:
+        if row.name in errors:
+            row.attempts += 1
+            row.last_error = errors[row.name][:1000]
+            row.next_attempt_at = now + datetime.timedelta(seconds=RETRY_BASE_SECONDS * 2 ** row.attempts)
+            failed.append(row)
+    done = [row.pk for row in batch if row.name not in errors]
+    PendingFileDeletion.objects.filter(pk__in=done).delete()
+    if failed:
+        PendingFileDeletion.objects.bulk_update(failed, ['attempts', 'last_error', 'next_attempt_at'])
+        logger.warning('%d file deletion(s) failed and will be retried', len(failed))
+    return len(due) - len(failed), len(kept), len(failed)
+
+
+# ---------------------------------------------------------------------------
+# Orphan scan
+# ---------------------------------------------------------------------------
+
+def _walk(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield f'{path}{name}'
+    for directory in directories:
+        yield from _walk(storage, f'{path}{directory}/')
+
+
+def list_files(storage, directory):
+    """Stored names of every file under ``directory``, or [] when it can't be listed"""
+    # Cloudinary public ids (and so stored names) carry the storage's prefix
+    if hasattr(storage, '_prepend_prefix'):
+        directory = storage._prepend_prefix(directory)
+    try:
+        return list(_walk(storage, directory))
+    except (FileNotFoundError, NotImplementedError):
+        return []
+
+
+def scan_orphans(storage=default_storage):
+    """``(name, directory)`` for stored files under FileField upload dirs that nothing references"""
+    directories = {}
+    referenced = set()
+    for model, field in file_fields():
+        if isinstance(field.upload_to, str) and field.upload_to:
+            directories.setdefault(field.upload_to.split('%')[0].rstrip('/') + '/', _label(model, field))
+        referenced.update(
+            model._base_manager.exclude(**{field.attname: ''}).exclude(**{f'{field.attname}__isnull': True})
+            .values_list(field.attname, flat=True)
+        )
+
+    for directory, source in sorted(directories.items()):
+        for name in list_files(storage, directory):
+            if name not in referenced:
+                yield name, source
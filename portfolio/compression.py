@@ -0,0 +1,156 @@
+"""
+Brotli/gzip compression of dynamic responses.
+
+Compressed bodies are kept in a per-process LRU keyed by a hash of the
+uncompressed body and the encoding, so a page whose HTML hasn't changed
+is compressed once per worker and then served from memory; hashing costs
+a small fraction of compressing. Brotli is used when the ``brotli``
+package is installed and the client accepts it, otherwise gzip.
+
+Per-user pages (those that vary on Cookie, such as pages embedding a CSRF
+token) are never cached and are only ever gzipped with Django's random
+filename padding, as GZipMiddleware does, to blunt BREACH; clients that
+don't accept gzip get them uncompressed.
+"""
+
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.text import compress_sequence, compress_string
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/manifest+json',
+    'image/svg+xml',
+)
+
+
+def accepted_encodings(header):
+    """Encodings the client accepts from an Accept-Encoding header, with q > 0"""
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            accepted.add(name)
+    return accepted
+
+
+def choose_encoding(header, padded=False):
+    """Best encoding we support for ``header``, or None; padded bodies are gzip only"""
+    if not header:
+        return None
+    accepted = accepted_encodings(header)
+    if not padded and brotli is not None and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    # mtime=0 keeps output identical for identical input
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of byte chunks, flushing after each one"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    # gzip framing around a raw deflate stream (wbits=31)
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressedBodyCache:
+    """Thread-safe LRU of compressed bodies, bounded by total bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+body_cache = CompressedBodyCache(settings.COMPRESSION_CACHE_BYTES)
+
+
+def compress_padded(body):
+    """Gzip with random padding, for bodies that contain secrets"""
+    return compress_string(body, max_random_bytes=100)
+
+
+def compress_stream_padded(chunks):
+    """Streaming counterpart of ``compress_padded``"""
+    return compress_sequence(chunks, max_random_bytes=100)
+
+
+def compress_cached(body, encoding):
+    """Compressed ``body``, reusing the result for identical bodies"""
+    if not body_cache.max_bytes:
+        return compress(body, encoding)
+    key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+    compressed = body_cache.get(key)
+    metrics.record_cache_lookup('compression', compressed is not None)
+    if compressed is None:
+        compressed = compress(body, encoding)
+        body_cache.set(key, compressed)
+    return compressed
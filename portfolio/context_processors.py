@@ -0,0 +1,3 @@
+def tenant(request):
+    """Expose the current portfolio as ``profile`` to every template"""
+    return {'profile': getattr(request, 'tenant', None)}
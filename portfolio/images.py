@@ -0,0 +1,271 @@
+"""
+Background optimization of CKEditor uploads.
+
+Uploaded images are saved untouched so the editor gets its URL right
+away. A small thread pool then writes a resized, recompressed copy with
+EXIF and other metadata stripped (``<name>_opt.<ext>``) and records it as
+an OptimizedImage. On storages with local paths it then overwrites the
+original in place with the same bytes, so the URL the editor inserted
+stops serving the upload's EXIF data (GPS position, camera serial).
+Storages that choose their own names, such as Cloudinary, can't
+overwrite a name, so there the original is left alone and only the
+rewritten ``<img>`` tags stop linking to it.
+
+``rewrite_images`` swaps ``<img>`` tags in rich text over to the
+optimized copy with ``width``/``height``/``loading="lazy"``. It runs
+whenever a text block is saved and again when a job finishes, for
+content saved before its image was ready.
+
+Queued jobs only live in the worker's memory, so uploads still queued
+when a worker is recycled or restarted are dropped. ``optimize_images
+--scan-uploads`` is the recovery path: it optimizes every upload that has
+no OptimizedImage yet.
+"""
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import unquote, urlsplit
+
+from ckeditor_uploader.backends import PillowBackend
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+from .purge import project_key, purge_keys
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZED_SUFFIX = '_opt'
+SKIPPED_SUFFIXES = (OPTIMIZED_SUFFIX, '_thumb')
+FORMATS = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.webp': 'WEBP'}
+
+IMG_TAG_RE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+ATTR_RE = re.compile(r'([\w:-]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s"\'>]+))?')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_OPTIMIZE_WORKERS,
+                thread_name_prefix='image-optimize',
+            )
+        return _executor
+
+
+def optimized_name(name):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}{OPTIMIZED_SUFFIX}{ext}'
+
+
+def is_optimizable(name):
+    stem, ext = os.path.splitext(name)
+    return ext.lower() in FORMATS and not stem.endswith(SKIPPED_SUFFIXES)
+
+
+def upload_name_from_url(url):
+    """Storage name of a CKEditor upload referenced by ``url``, or None"""
+    path = unquote(urlsplit(url).path)
+    marker = '/' + settings.CKEDITOR_UPLOAD_PATH.strip('/') + '/'
+    index = path.find(marker)
+    if index < 0:
+        return None
+    return path[index + 1:]
+
+
+def optimize_file(name):
+    """
+    Write the optimized copy of upload ``name`` and record it.
+
+    Returns the OptimizedImage, or None when the file isn't an image we
+    handle or can't be read.
+    """
+    from .models import OptimizedImage
+
+    if not is_optimizable(name):
+        return None
+    existing = OptimizedImage.objects.filter(original=name).first()
+    if existing:
+        return existing
+
+    try:
+        with default_storage.open(name) as source:
+            original = source.read()
+        image = Image.open(BytesIO(original))
+        if getattr(image, 'is_animated', False):
+            return None
+        image = ImageOps.exif_transpose(image)
+    except (OSError, ValueError):
+        logger.warning('Could not read upload %s for optimization', name, exc_info=True)
+        return None
+
+    max_width = settings.IMAGE_MAX_WIDTH
+    if image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)), Image.Resampling.LANCZOS)
+
+    fmt = FORMATS[os.path.splitext(name)[1].lower()]
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    # Drop EXIF, ICC, XMP and text chunks carried over from the source
+    image.info = {}
+    save_options = {'optimize': True}
+    if fmt in ('JPEG', 'WEBP'):
+        save_options['quality'] = settings.IMAGE_QUALITY
+    if fmt == 'JPEG':
+        save_options['progressive'] = True
+    out = BytesIO()
+    image.save(out, format=fmt, **save_options)
+
+    stored = default_storage.save(optimized_name(name), ContentFile(out.getvalue()))
+    record, _ = OptimizedImage.objects.update_or_create(
+        original=name,
+        defaults={
+            'optimized': stored,
+            'width': image.width,
+            'height': image.height,
+            'original_bytes': len(original),
+            'optimized_bytes': out.tell(),
+        },
+    )
+    replace_original(name, out.getvalue())
+    return record
+
+
+def replace_original(name, data):
+    """
+    Overwrite upload ``name`` with ``data`` in place; returns whether it did.
+
+    The bytes go to a temporary file next to the original that is renamed
+    over it, so the original is never missing, even briefly. Storages
+    without local paths are skipped.
+    """
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        return False
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        shutil.copymode(path, temporary)
+        os.replace(temporary, path)
+    except OSError:
+        logger.warning('Could not replace upload %s with its optimized copy', name, exc_info=True)
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        return False
+    return True
+
+
+def _attrs(tag):
+    body = tag[4:].rstrip('>').rstrip('/').strip()
+    attrs = {}
+    for name, value in ATTR_RE.findall(body):
+        if value[:1] in ('"', "'"):
+            value = value[1:-1]
+        attrs[name.lower()] = value
+    return attrs
+
+
+def _render_tag(attrs):
+    parts = []
+    for name, value in attrs.items():
+        escaped = value.replace('"', '&quot;')
+        parts.append(f'{name}="{escaped}"')
+    return '<img ' + ' '.join(parts) + '>'
+
+
+def rewrite_images(html, optimized=None):
+    """
+    Point ``<img>`` tags at optimized uploads and add size/lazy attributes.
+
+    ``optimized`` maps upload names to OptimizedImage rows; when omitted
+    the rows for the images in ``html`` are fetched in one query.
+    """
+    if not html or '<img' not in html.lower():
+        return html
+    tags = [(match, _attrs(match.group(0))) for match in IMG_TAG_RE.finditer(html)]
+
+    if optimized is None:
+        from .models import OptimizedImage
+
+        names = {upload_name_from_url(attrs.get('src', '')) for _, attrs in tags}
+        names.discard(None)
+        optimized = {row.original: row for row in OptimizedImage.objects.filter(original__in=names)}
+
+    pieces, last = [], 0
+    for match, attrs in tags:
+        name = upload_name_from_url(attrs.get('src', ''))
+        row = optimized.get(name)
+        if row is None:
+            continue
+        attrs['src'] = default_storage.url(row.optimized)
+        attrs['width'] = str(row.width)
+        attrs['height'] = str(row.height)
+        attrs.setdefault('loading', 'lazy')
+        attrs.setdefault('decoding', 'async')
+        pieces.append(html[last:match.start()])
+        pieces.append(_render_tag(attrs))
+        last = match.end()
+    if not pieces:
+        return html
+    pieces.append(html[last:])
+    return ''.join(pieces)
+
+
+def rewrite_referencing(name):
+    """Rewrite text blocks that embed upload ``name``"""
+    from .models import ProjectContent
+
+    blocks = list(
+        ProjectContent.objects.filter(content_type='text', text_content__contains=os.path.basename(name))
+        .only('pk', 'project_id', 'text_content')
+    )
+    changed = []
+    for block in blocks:
+        html = rewrite_images(block.text_content)
+        if html != block.text_content:
+            block.text_content = html
+            changed.append(block)
+    if changed:
+        ProjectContent.objects.bulk_update(changed, ['text_content'])
+        purge_keys({project_key(block.project_id) for block in changed})
+    return len(changed)
+
+
+def _optimize_job(name):
+    try:
+        if optimize_file(name):
+            rewrite_referencing(name)
+    except Exception:
+        logger.exception('Image optimization failed for %s', name)
+    finally:
+        close_old_connections()
+
+
+def submit(name):
+    """Queue upload ``name`` for optimization outside the request"""
+    if is_optimizable(name):
+        _pool().submit(_optimize_job, name)
+
+
+class OptimizingPillowBackend(PillowBackend):
+    """CKEditor image backend that queues every upload for optimization"""
+
+    def save_as(self, filepath):
+        saved_path = super().save_as(filepath)
+        if self.is_image:
+            submit(saved_path)
+        return saved_path
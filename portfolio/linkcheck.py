@@ -0,0 +1,93 @@
+"""
+Concurrent health checks for external links.
+
+Requests run on asyncio with a global concurrency limit and a smaller
+per-host limit, so one slow site can't hog every slot and no site gets
+hammered. Each URL is tried with HEAD first and falls back to a GET when
+the server rejects HEAD or the HEAD request fails. The blocking urllib
+calls run in worker threads via ``asyncio.to_thread``, which keeps the
+checker dependency-free.
+"""
+
+import asyncio
+import re
+import socket
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+HREF_RE = re.compile(r'<a\b[^>]*\bhref\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+# Statuses that mean "HEAD isn't supported here", not "the link is broken"
+HEAD_FALLBACK_STATUSES = {400, 403, 404, 405, 429, 500, 501, 503}
+
+USER_AGENT = 'portfolio-link-checker/1.0'
+
+
+@dataclass
+class LinkResult:
+    url: str
+    status_code: int | None
+    ok: bool
+    error: str = ''
+    elapsed: float = 0.0
+
+
+def extract_links(html):
+    """Absolute http(s) links in an HTML fragment"""
+    return {
+        url for url in HREF_RE.findall(html or '')
+        if url.startswith(('http://', 'https://'))
+    }
+
+
+def _request(url, method, timeout):
+    request = urllib.request.Request(url, method=method, headers={'User-Agent': USER_AGENT})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            if method == 'GET':
+                response.read(1024)
+            return response.status, ''
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.reason if isinstance(exc.reason, str) else ''
+    except (urllib.error.URLError, socket.timeout, ConnectionError, OSError, ValueError) as exc:
+        reason = getattr(exc, 'reason', exc)
+        return None, str(reason) or exc.__class__.__name__
+
+
+class LinkChecker:
+    """Checks many URLs with bounded global and per-host concurrency"""
+
+    def __init__(self, concurrency=20, per_host=2, timeout=10.0):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+
+    async def check(self, url):
+        host = urlsplit(url).netloc.lower()
+        host_limit = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with self._global, host_limit:
+            start = time.monotonic()
+            status, error = await asyncio.to_thread(_request, url, 'HEAD', self.timeout)
+            if status is None or status in HEAD_FALLBACK_STATUSES:
+                status, error = await asyncio.to_thread(_request, url, 'GET', self.timeout)
+            elapsed = time.monotonic() - start
+        ok = status is not None and 200 <= status < 400
+        return LinkResult(url, status, ok, '' if ok else error, elapsed)
+
+    async def check_all(self, urls):
+        self._global = asyncio.Semaphore(self.concurrency)
+        self._hosts = {}
+        # Size the thread pool to the concurrency limit so to_thread never queues
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='link-check')
+        )
+        results = await asyncio.gather(*(self.check(url) for url in urls))
+        return {result.url: result for result in results}
+
+    def run(self, urls):
+        """Synchronous entry point for management commands"""
+        return asyncio.run(self.check_all(sorted(set(urls))))
@@ -0,0 +1,287 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark function under ``name``"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def per_call(func, iterations):
+    """Average wall time of ``func()`` in microseconds"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+@benchmark('ratelimit')
+def bench_ratelimit(iterations):
+    """Per-request overhead of the contact form limiter"""
+    from portfolio.ratelimit import RateLimit, check_contact_rate
+
+    factory = RequestFactory()
+    request = factory.post('/', {'email': 'someone@example.com'}, REMOTE_ADDR='203.0.113.7')
+    unlimited = {'global': f'{iterations * 10}/60', 'ip': f'{iterations * 10}/60', 'email': f'{iterations * 10}/60'}
+
+    with override_settings(CACHES=LOCMEM_CACHE, CONTACT_RATE_LIMITS=unlimited):
+        single = RateLimit('bench', f'{iterations * 10}/60')
+        counter = iter(range(iterations * 2))
+        yield 'RateLimit.hit (same key)', per_call(lambda: single.hit('k'), iterations)
+        yield 'RateLimit.hit (distinct keys)', per_call(lambda: single.hit(next(counter)), iterations)
+        yield 'check_contact_rate (3 limits)', per_call(lambda: check_contact_rate(request), iterations)
+
+
+@benchmark('metrics')
+def bench_metrics(iterations):
+    """Instrumentation cost added to each request"""
+    from django.http import HttpResponse
+
+    from portfolio import metrics
+    from portfolio.middleware import MetricsMiddleware
+
+    factory = RequestFactory()
+    request = factory.get('/')
+    response = HttpResponse(b'x' * 2048)
+
+    with override_settings(METRICS_MULTIPROC_DIR=''):
+        metrics.registry.reset()
+        yield 'observe_request', per_call(
+            lambda: metrics.observe_request('index', 'GET', 200, 0.012, 2048, 4), iterations)
+        yield 'record_cache_lookup', per_call(
+            lambda: metrics.record_cache_lookup('default', True), iterations)
+
+        bare = per_call(lambda: response, iterations)
+        middleware = MetricsMiddleware(lambda req: response)
+        wrapped = per_call(lambda: middleware(request), iterations)
+        yield 'MetricsMiddleware overhead per request', wrapped - bare
+        metrics.registry.reset()
+
+
+@benchmark('tenants')
+def bench_tenants(iterations):
+    """Cost of routing a request to its portfolio"""
+    from portfolio.tenants import TenantMap
+
+    tenants = TenantMap()
+    tenants.load(ttl=3600)
+    host = 'bench.example.com'
+    tenants.resolve(host, 3600)
+    yield 'TenantMap.resolve (warm host)', per_call(lambda: tenants.resolve(host, 3600), iterations)
+    yield 'TenantMap.load', per_call(lambda: tenants.load(3600), max(1, iterations // 100))
+
+
+def _sample_page(blocks=60):
+    """Portfolio-like HTML of about 30 KB"""
+    from django.utils.lorem_ipsum import paragraphs
+
+    body = ''.join(
+        f'<section class="content-block text-block"><div class="container"><p>{text}</p></div></section>\n'
+        for text in paragraphs(blocks, common=False)
+    )
+    return f'<!DOCTYPE html><html lang="en"><head><title>Project</title></head><body>{body}</body></html>'.encode()
+
+
+@benchmark('compression')
+def bench_compression(iterations):
+    """Bytes sent and CPU time per response for each encoding"""
+    import hashlib
+
+    from portfolio import compression
+
+    page = _sample_page()
+    runs = max(1, iterations // 100)
+    yield 'uncompressed bytes', f'{len(page):10d}'
+
+    variants = [('gzip', 'COMPRESSION_GZIP_LEVEL', level) for level in (1, 6, 9)]
+    if compression.brotli is not None:
+        variants += [('br', 'COMPRESSION_BROTLI_QUALITY', quality) for quality in (4, 5, 11)]
+
+    for encoding, setting, level in variants:
+        with override_settings(**{setting: level}):
+            compressed = compression.compress(page, encoding)
+            yield f'{encoding}-{level}: bytes sent', f'{len(compressed):10d}'
+            yield f'{encoding}-{level}: compress', per_call(lambda: compression.compress(page, encoding), runs)
+    yield 'gzip + random padding (per-user pages)', per_call(lambda: compression.compress_padded(page), runs)
+
+    compression.body_cache.clear()
+    encoding = 'br' if compression.brotli is not None else 'gzip'
+    compression.compress_cached(page, encoding)
+    yield f'cached {encoding} body (hash + lookup)', per_call(
+        lambda: compression.compress_cached(page, encoding), iterations)
+    yield 'blake2b of body alone', per_call(lambda: hashlib.blake2b(page, digest_size=16).digest(), iterations)
+    compression.body_cache.clear()
+
+
+@benchmark('related')
+def bench_related(iterations):
+    """Related-projects index: vectorized rebuild against per-project scoring"""
+    import random
+
+    from portfolio import related
+
+    rng = random.Random(42)
+    vocabulary = [f'tech{index}' for index in range(60)]
+    for size in (100, 500, 2000):
+        ids = list(range(1, size + 1))
+        tech_sets = [frozenset(rng.sample(vocabulary, rng.randint(2, 8))) for _ in ids]
+        techs_by_id = dict(zip(ids, tech_sets))
+        weights = related.idf_weights(tech_sets)
+        runs = max(1, iterations // (size * 10))
+
+        yield f'{size} projects: vectorized rebuild', per_call(
+            lambda: related.top_k_vectorized(ids, tech_sets, 3), runs)
+        yield f'{size} projects: one project, all candidates', per_call(
+            lambda: related.top_k_for(1, techs_by_id, weights, 3), runs * 10)
+
+
+@benchmark('snapshot')
+def bench_snapshot(iterations):
+    """Data for the home page from the ORM against a read-only snapshot"""
+    import os
+    import tempfile
+
+    from portfolio import snapshot
+    from portfolio.models import Education, Experience, Project, Skill
+    from portfolio.tenants import for_tenant, get_tenant
+
+    tenant = get_tenant()
+
+    def from_orm():
+        list(for_tenant(Skill.objects.all(), tenant))
+        list(for_tenant(Project.objects.filter(is_featured=True), tenant)[:3])
+        list(for_tenant(Education.objects.all(), tenant))
+        list(for_tenant(Experience.objects.all(), tenant))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'snapshot.bin')
+        records, size = snapshot.build(path)
+        yield 'snapshot size', f'{size / 1024:10.1f} KiB ({records} records)'
+        runs = max(1, iterations // 100)
+        yield 'home page data from the ORM', per_call(from_orm, runs)
+        yield 'open snapshot and decode the portfolio', per_call(
+            lambda: snapshot.Snapshot(path).portfolio(tenant), runs)
+        loaded = snapshot.Snapshot(path)
+        yield 'home page data from a loaded snapshot', per_call(
+            lambda: loaded.portfolio(tenant).featured_projects(), iterations)
+
+
+def _free_port():
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=30):
+    import socket
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+@benchmark('workers')
+def bench_workers(iterations):
+    """Homepage throughput and latency for each gunicorn worker class"""
+    import importlib.util
+    import os
+    import subprocess
+    import sys
+    import urllib.error
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django.conf import settings
+
+    classes = ['sync', 'gthread']
+    classes += [name for name in ('gevent', 'eventlet') if importlib.util.find_spec(name)]
+    requests = min(iterations, 2000)
+    clients = 16
+
+    def fetch(url):
+        request = urllib.request.Request(url, headers={'Host': 'localhost', 'X-Forwarded-Proto': 'https'})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as exc:
+            status = exc.code
+        return time.perf_counter() - start, status
+
+    for worker_class in classes:
+        port = _free_port()
+        env = dict(
+            os.environ,
+            PORT=str(port),
+            GUNICORN_WORKER_CLASS=worker_class,
+            WEB_CONCURRENCY=os.environ.get('WEB_CONCURRENCY', '2'),
+            GUNICORN_MAX_REQUESTS='0',
+        )
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'portfolio_site.wsgi', '-c', 'gunicorn.conf.py'],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not _wait_for_port(port):
+                yield f'{worker_class}: server did not start', ''
+                continue
+            url = f'http://127.0.0.1:{port}/'
+            fetch(url)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=clients) as pool:
+                results = list(pool.map(fetch, [url] * requests))
+            elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status in results if status != 200)
+        yield f'{worker_class}: requests/s ({clients} clients)', f'{requests / elapsed:10.1f}'
+        yield f'{worker_class}: p50 latency', latencies[len(latencies) // 2] * 1e6
+        yield f'{worker_class}: p95 latency', latencies[int(len(latencies) * 0.95)] * 1e6
+        yield f'{worker_class}: non-200 responses', f'{errors:10d}'
+
+
+class Command(BaseCommand):
+    help = 'Runs micro-benchmarks of request-path helpers and reports time per call'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f'Benchmarks to run (default: all of {", ".join(BENCHMARKS)})')
+        parser.add_argument('--iterations', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f'Unknown benchmark(s): {", ".join(unknown)}')
+
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, value in BENCHMARKS[name](options['iterations']):
+                if isinstance(value, float):
+                    value = f'{value:10.2f} us'
+                self.stdout.write(f'  {label:<45} {value}')
@@ -0,0 +1,23 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from portfolio import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Writes the public content to a read-only snapshot file served when SNAPSHOT_MODE is on'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.SNAPSHOT_PATH, help='Snapshot file (default: SNAPSHOT_PATH)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        records, size = snapshot.build(options['output'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {records} record(s), {size / 1024:.1f} KiB, to {options['output']} in {elapsed:.2f}s"
+        ))
+        if not settings.SNAPSHOT_MODE:
+            self.stdout.write('SNAPSHOT_MODE is off; set it to serve the public pages from this file')
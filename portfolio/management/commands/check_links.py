@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from portfolio.linkcheck import LinkChecker, extract_links
+from portfolio.models import LinkCheck, Project, ProjectContent
+
+
+class Command(BaseCommand):
+    help = 'Checks project URLs and links inside project content, storing results for the admin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', default=[],
+                            help='Check only this URL (repeatable), e.g. against a local test server')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--per-host', type=int, default=2)
+        parser.add_argument('--timeout', type=float, default=10.0)
+        parser.add_argument('--ttl', type=int, default=24 * 3600,
+                            help='Seconds a stored result stays fresh and is not re-checked')
+        parser.add_argument('--force', action='store_true', help='Ignore cached results')
+
+    def collect(self):
+        """Map every external URL to the ids of the projects using it"""
+        usage = {}
+        for project_id, github_url, live_url in Project.objects.values_list('pk', 'github_url', 'live_url'):
+            for url in (github_url, live_url):
+                if url:
+                    usage.setdefault(url, set()).add(project_id)
+
+        blocks = (
+            ProjectContent.objects.filter(content_type__in=['text', 'markdown'])
+            .values_list('project_id', 'text_content', 'markdown_html')
+        )
+        for project_id, text_content, markdown_html in blocks.iterator(chunk_size=500):
+            for url in extract_links(text_content) | extract_links(markdown_html):
+                usage.setdefault(url, set()).add(project_id)
+        return usage
+
+    def handle(self, *args, **options):
+        usage = {url: set() for url in options['url']} if options['url'] else self.collect()
+
+        now = timezone.now()
+        fresh = set()
+        if not options['force']:
+            fresh = set(
+                LinkCheck.objects.filter(url__in=usage, checked_at__gte=now - timedelta(seconds=options['ttl']))
+                .values_list('url', flat=True)
+            )
+        to_check = [url for url in usage if url not in fresh]
+        self.stdout.write(f'{len(usage)} link(s), {len(fresh)} cached, checking {len(to_check)}')
+
+        checker = LinkChecker(
+            concurrency=options['concurrency'],
+            per_host=options['per_host'],
+            timeout=options['timeout'],
+        )
+        results = checker.run(to_check)
+
+        with transaction.atomic():
+            existing = {check.url: check for check in LinkCheck.objects.filter(url__in=results)}
+            to_create, to_update = [], []
+            for url, result in results.items():
+                check = existing.get(url) or LinkCheck(url=url)
+                check.status_code = result.status_code
+                check.ok = result.ok
+                check.error = result.error[:300]
+                check.response_ms = result.elapsed * 1000
+                check.checked_at = now
+                (to_update if check.pk else to_create).append(check)
+            LinkCheck.objects.bulk_create(to_create)
+            LinkCheck.objects.bulk_update(
+                to_update, ['status_code', 'ok', 'error', 'response_ms', 'checked_at'])
+
+            if not options['url']:
+                # A full scan covers every project, so links no longer used anywhere lose theirs too
+                Through = LinkCheck.projects.through
+                checks = dict(LinkCheck.objects.filter(url__in=usage).values_list('url', 'pk'))
+                Through.objects.all().delete()
+                Through.objects.bulk_create([
+                    Through(linkcheck_id=checks[url], project_id=project_id)
+                    for url, project_ids in usage.items() if url in checks
+                    for project_id in project_ids
+                ])
+
+        for result in sorted(results.values(), key=lambda r: r.url):
+            if not result.ok:
+                self.stdout.write(self.style.ERROR(
+                    f'  BROKEN {result.url} ({result.status_code or result.error})'))
+
+        broken = LinkCheck.objects.filter(url__in=usage, ok=False).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(results)} link(s); {broken} of {len(usage)} currently broken'))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from portfolio import cleanup
+from portfolio.models import PendingFileDeletion
+
+
+class Command(BaseCommand):
+    help = 'Deletes queued media files from storage in batches, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.FILE_DELETE_BATCH_SIZE)
+        parser.add_argument('--max-attempts', type=int, default=settings.FILE_DELETE_MAX_ATTEMPTS)
+        parser.add_argument('--dry-run', action='store_true', help='Report what is due without deleting anything')
+
+    def handle(self, *args, **options):
+        totals = [0, 0, 0]
+        while True:
+            counts = cleanup.process_batch(options['batch_size'], options['max_attempts'], options['dry_run'])
+            totals = [total + count for total, count in zip(totals, counts)]
+            # A dry run leaves the rows in place, so one batch is all it can report
+            if options['dry_run'] or not any(counts):
+                break
+
+        deleted, kept, failed = totals
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(f'{verb} {deleted} file(s); {kept} still referenced and dropped from the queue')
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} deletion(s) failed and will be retried'))
+        exhausted = PendingFileDeletion.objects.filter(attempts__gte=options['max_attempts']).count()
+        if exhausted:
+            self.stdout.write(self.style.WARNING(
+                f'{exhausted} file(s) gave up after {options["max_attempts"]} attempts; see the admin for errors'
+            ))
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import transfer
+from portfolio.tenants import get_tenant
+
+
+class Command(BaseCommand):
+    help = "Streams one portfolio's content to a JSONL file or a directory of Markdown files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output .jsonl file, '-' for stdout, or a directory for Markdown")
+        parser.add_argument(
+            '--format',
+            choices=['jsonl', 'markdown'],
+            help='Output format (default: jsonl for files and stdout, markdown for directories)',
+        )
+        parser.add_argument('--domain', help='Domain of the portfolio to export (default: the default portfolio)')
+        parser.add_argument('--batch-size', type=int, default=transfer.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path == '-' or path.endswith('.jsonl') else 'markdown')
+        profile = get_tenant(options['domain'])
+        if profile is None:
+            raise CommandError('No such portfolio')
+        records = transfer.iter_records(profile, batch_size=options['batch_size'])
+
+        if fmt == 'markdown':
+            count = transfer.write_markdown(records, path)
+        elif path == '-':
+            count = transfer.write_jsonl(records, sys.stdout)
+        else:
+            with open(path, 'w', encoding='utf-8') as stream:
+                count = transfer.write_jsonl(records, stream)
+
+        self.stderr.write(self.style.SUCCESS(f'Exported {count} record(s) to {path}'))
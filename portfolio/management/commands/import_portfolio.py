@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import related, transfer
+from portfolio.tenants import get_tenant
+
+
+class Command(BaseCommand):
+    help = 'Imports portfolio content from export_portfolio output using batched upserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input .jsonl file, '-' for stdin, or a Markdown export directory")
+        parser.add_argument(
+            '--domain',
+            help='Portfolio to import into when the input has no profile record (default: the default portfolio)',
+        )
+        parser.add_argument('--batch-size', type=int, default=transfer.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        profile = get_tenant(options['domain'])
+        if options['domain'] and profile is None:
+            raise CommandError(f"No portfolio is served on {options['domain']}")
+
+        def progress(record_type, count):
+            self.stdout.write(f'  {record_type}: {count} imported')
+
+        importer = transfer.Importer(batch_size=options['batch_size'], progress=progress, profile=profile)
+        try:
+            if path == '-':
+                counts = importer.feed(transfer.read_jsonl(sys.stdin))
+            elif Path(path).is_dir():
+                counts = importer.feed(transfer.read_markdown(path))
+            else:
+                with open(path, encoding='utf-8') as stream:
+                    counts = importer.feed(transfer.read_jsonl(stream))
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Import failed: {exc}')
+
+        if importer.profile is not None:
+            # Bulk upserts bypass the per-save refresh
+            related.rebuild(importer.profile.pk)
+
+        summary = ', '.join(f'{count} {record_type}' for record_type, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Imported {summary or "nothing"}'))
@@ -0,0 +1,74 @@
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Runs a local stand-in for external sites to test check_links against'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8082)
+
+    def handle(self, *args, **options):
+        command = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            /status/<code>  answers with that status
+            /slow/<secs>    answers 200 after a delay, to exercise timeouts
+            /no-head        rejects HEAD with a 405 and answers GET with a 200
+            /redirect       redirects to /status/200
+            """
+
+            def do_HEAD(self):
+                self._handle(head=True)
+
+            def do_GET(self):
+                self._handle(head=False)
+
+            def _handle(self, head):
+                command.stdout.write(f'{self.command} {self.path}')
+                parts = self.path.strip('/').split('/')
+                try:
+                    if parts[0] == 'status':
+                        return self._reply(int(parts[1]), head)
+                    if parts[0] == 'slow':
+                        time.sleep(float(parts[1]))
+                        return self._reply(200, head)
+                except (IndexError, ValueError):
+                    return self._reply(400, head)
+                if parts[0] == 'no-head':
+                    return self._reply(405 if head else 200, head)
+                if parts[0] == 'redirect':
+                    self.send_response(302)
+                    self.send_header('Location', '/status/200')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self._reply(404, head)
+
+            def _reply(self, status, head):
+                body = f'{status}\n'.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        base = f"http://{options['host']}:{options['port']}"
+        self.stdout.write(f'Link test server listening on {base}')
+        self.stdout.write(f'Try: python manage.py check_links --url {base}/status/200 --url {base}/no-head '
+                          f'--url {base}/status/404 --url {base}/slow/5 --timeout 2')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from portfolio import images
+from portfolio.cleanup import list_files
+from portfolio.models import OptimizedImage, ProjectContent
+
+
+def _optimize(name):
+    try:
+        return images.optimize_file(name)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Optimizes images embedded in existing rich text and rewrites their <img> tags'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--scan-uploads', action='store_true',
+                            help='Also optimize uploads that no content embeds, e.g. jobs lost when a worker restarted')
+
+    def handle(self, *args, **options):
+        blocks = (
+            ProjectContent.objects.filter(content_type='text', text_content__icontains='<img')
+            .only('pk', 'text_content')
+        )
+
+        names = set()
+        for block in blocks.iterator(chunk_size=options['batch_size']):
+            for match in images.IMG_TAG_RE.finditer(block.text_content):
+                name = images.upload_name_from_url(images._attrs(match.group(0)).get('src', ''))
+                if name and images.is_optimizable(name):
+                    names.add(name)
+        if options['scan_uploads']:
+            names.update(name for name in self.uploads() if images.is_optimizable(name))
+
+        pending = names - set(OptimizedImage.objects.filter(original__in=names).values_list('original', flat=True))
+        self.stdout.write(f'Found {len(names)} upload(s), {len(pending)} to optimize')
+
+        optimized = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for record in pool.map(_optimize, sorted(pending)):
+                if record is not None:
+                    optimized += 1
+                    saved = record.original_bytes - record.optimized_bytes
+                    self.stdout.write(f'  {record.original}: {record.width}x{record.height}, {saved:+d} bytes saved')
+
+        lookup = {row.original: row for row in OptimizedImage.objects.filter(original__in=names)}
+        rewritten, batch = 0, []
+        for block in blocks.iterator(chunk_size=options['batch_size']):
+            html = images.rewrite_images(block.text_content, lookup)
+            if html != block.text_content:
+                block.text_content = html
+                batch.append(block)
+            if len(batch) >= options['batch_size']:
+                ProjectContent.objects.bulk_update(batch, ['text_content'])
+                rewritten += len(batch)
+                batch = []
+        if batch:
+            ProjectContent.objects.bulk_update(batch, ['text_content'])
+            rewritten += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Optimized {optimized} image(s), rewrote {rewritten} content block(s)'
+        ))
+
+    def uploads(self):
+        return list_files(default_storage, settings.CKEDITOR_UPLOAD_PATH.strip('/') + '/')
@@ -0,0 +1,60 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Runs a local stand-in for a CDN purge API that logs the surrogate keys it receives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8081)
+        parser.add_argument('--token', default='', help='Require "Authorization: Bearer <token>"')
+        parser.add_argument('--fail-every', type=int, default=0, help='Answer every Nth request with a 503')
+
+    def handle(self, *args, **options):
+        command = self
+        lock = threading.Lock()
+        state = {'requests': 0, 'keys': 0}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                with lock:
+                    state['requests'] += 1
+                    number = state['requests']
+                if options['token'] and self.headers.get('Authorization') != f"Bearer {options['token']}":
+                    return self._reply(401, {'error': 'unauthorized'})
+                if options['fail_every'] and number % options['fail_every'] == 0:
+                    return self._reply(503, {'error': 'simulated failure'})
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    keys = json.loads(self.rfile.read(length))['keys']
+                except (ValueError, KeyError, TypeError):
+                    return self._reply(400, {'error': 'expected {"keys": [...]}'})
+                with lock:
+                    state['keys'] += len(keys)
+                    total = state['keys']
+                command.stdout.write(f"#{number} purge {len(keys)} key(s) ({total} total): {' '.join(keys)}")
+                self._reply(200, {'status': 'ok', 'purged': len(keys)})
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(f"Purge server listening on http://{options['host']}:{options['port']}/purge")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from portfolio import ordering
+from portfolio.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Rebalances ProjectContent order values back onto the sparse grid'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebalance every project, not only those whose gaps are exhausted',
+        )
+
+    def handle(self, *args, **options):
+        rebalanced = 0
+        for project in Project.objects.only('pk').iterator():
+            if options['all'] or ordering.needs_rebalance(project):
+                ordering.rebalance(project)
+                rebalanced += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebalanced {rebalanced} project(s)'))
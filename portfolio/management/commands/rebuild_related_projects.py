@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import related
+from portfolio.models import Profile
+from portfolio.tenants import get_tenant
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the related-projects index with a vectorized similarity pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--domain', help='Only rebuild this portfolio (default: every portfolio)')
+
+    def handle(self, *args, **options):
+        if options['domain']:
+            profile = get_tenant(options['domain'])
+            if profile is None:
+                raise CommandError(f"No portfolio is served on {options['domain']}")
+            profile_ids = [profile.pk]
+        else:
+            profile_ids = list(Profile.objects.order_by('pk').values_list('pk', flat=True))
+
+        start = time.perf_counter()
+        rows = sum(related.rebuild(profile_id) for profile_id in profile_ids)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} related project(s) for {len(profile_ids)} portfolio(s) in {elapsed:.2f}s'
+        ))
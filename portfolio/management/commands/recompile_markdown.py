@@ -0,0 +1,63 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from portfolio.models import ProjectContent
+from portfolio.rendering import compile_markdown
+
+
+def _compile_chunk(chunk):
+    """Compile a list of (pk, source) pairs in a worker process"""
+    return [(pk, *compile_markdown(source)) for pk, source in chunk]
+
+
+class Command(BaseCommand):
+    help = 'Recompiles every Markdown content block in parallel worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        rows = (
+            ProjectContent.objects.filter(content_type='markdown')
+            .order_by('pk')
+            .values_list('pk', 'markdown_source')
+            .iterator(chunk_size=chunk_size * 10)
+        )
+
+        def chunks():
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+        def save(results):
+            blocks = [
+                ProjectContent(pk=pk, markdown_html=html, markdown_toc=toc)
+                for pk, html, toc in results
+            ]
+            ProjectContent.objects.bulk_update(blocks, ['markdown_html', 'markdown_toc'])
+            return len(blocks)
+
+        compiled = 0
+        # Executor.map would pull every chunk off the queryset up front; keep a
+        # bounded window in flight so memory stays flat however many blocks there are
+        window = options['workers'] * 2
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for chunk in chunks():
+                pending.append(pool.submit(_compile_chunk, chunk))
+                if len(pending) >= window:
+                    compiled += save(pending.popleft().result())
+            while pending:
+                compiled += save(pending.popleft().result())
+
+        self.stdout.write(self.style.SUCCESS(f'Recompiled {compiled} Markdown block(s)'))
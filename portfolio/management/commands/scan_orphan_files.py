@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from portfolio import cleanup
+
+
+class Command(BaseCommand):
+    help = 'Lists stored media files that no FileField references, optionally queueing them for deletion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enqueue', action='store_true', help='Queue the orphans for delete_pending_files')
+
+    def handle(self, *args, **options):
+        orphans = list(cleanup.scan_orphans())
+        for name, source in orphans:
+            self.stdout.write(f'{name}  ({source})')
+        if options['enqueue']:
+            cleanup.enqueue(orphans, 'orphan')
+            self.stdout.write(self.style.SUCCESS(f'Queued {len(orphans)} orphaned file(s) for deletion'))
+        else:
+            self.stdout.write(f'{len(orphans)} orphaned file(s); rerun with --enqueue to queue them')
@@ -0,0 +1,270 @@
+"""
+In-process request metrics with Prometheus text exposition.
+
+Every worker keeps its own counters and histograms in plain dicts. When
+``METRICS_MULTIPROC_DIR`` is set, each worker periodically writes a JSON
+snapshot of its state to ``<dir>/metrics_<pid>_<start>.json`` and the
+/metrics endpoint sums the snapshots of all workers, so a scrape sees the
+whole gunicorn pool no matter which worker answers it. When a worker
+exits, gunicorn's ``child_exit`` hook calls ``archive_worker``, which
+folds its snapshot into ``metrics_archived.json`` and removes the file, so
+counters never go backwards and the directory doesn't grow with every
+recycled worker. The start time in the name keeps a reused pid from
+overwriting an older worker's snapshot.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name -> (type, help, label names, buckets)
+METRICS = {
+    'portfolio_requests_total': (
+        'counter', 'HTTP requests by route and status class', ('route', 'method', 'status'), None),
+    'portfolio_request_duration_seconds': (
+        'histogram', 'Request latency in seconds', ('route',), LATENCY_BUCKETS),
+    'portfolio_response_size_bytes': (
+        'summary', 'Response body size in bytes', ('route',), None),
+    'portfolio_db_queries': (
+        'histogram', 'Database queries per request', ('route',), QUERY_BUCKETS),
+    'portfolio_cache_requests_total': (
+        'counter', 'Cache lookups by cache and result', ('cache', 'result'), None),
+    'portfolio_purge_requests_total': (
+        'counter', 'Surrogate-key purge requests by result', ('result',), None),
+}
+
+
+class Registry:
+    """Counters, summaries and histograms for one process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # name -> {label values tuple -> value}; histograms store
+        # [per-bucket counts..., +Inf count, sum] and summaries [count, sum]
+        self.values = {name: {} for name in METRICS}
+        self.last_flush = 0.0
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            series = self.values[name]
+            series[labels] = series.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {json.dumps(labels): (list(value) if isinstance(value, list) else value)
+                       for labels, value in series.items()}
+                for name, series in self.values.items()
+            }
+
+
+registry = Registry()
+
+
+def observe_request(route, method, status, seconds, size, queries):
+    """Record one finished request under a single lock acquisition"""
+    values = registry.values
+    with registry.lock:
+        series = values['portfolio_requests_total']
+        key = (route, method, f'{status // 100}xx')
+        series[key] = series.get(key, 0) + 1
+
+        key = (route,)
+        for name, buckets, value in (
+            ('portfolio_request_duration_seconds', LATENCY_BUCKETS, seconds),
+            ('portfolio_db_queries', QUERY_BUCKETS, queries),
+        ):
+            state = values[name].get(key)
+            if state is None:
+                state = values[name][key] = [0] * (len(buckets) + 2)
+            state[bisect_left(buckets, value)] += 1
+            state[-1] += value
+
+        if size is not None:
+            state = values['portfolio_response_size_bytes'].get(key)
+            if state is None:
+                state = values['portfolio_response_size_bytes'][key] = [0, 0]
+            state[0] += 1
+            state[1] += size
+    maybe_flush()
+
+
+def record_cache_lookup(cache, hit):
+    """Count a cache lookup; call from any code that reads through a cache"""
+    registry.inc('portfolio_cache_requests_total', (cache, 'hit' if hit else 'miss'))
+
+
+# ---------------------------------------------------------------------------
+# Multiprocess aggregation
+# ---------------------------------------------------------------------------
+
+def _multiproc_dir():
+    path = getattr(settings, 'METRICS_MULTIPROC_DIR', '')
+    return Path(path) if path else None
+
+
+ARCHIVE_NAME = 'metrics_archived.json'
+
+# pid -> snapshot file name of this process, set on its first flush
+_snapshot_names = {}
+
+
+def _write(path, data):
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def flush():
+    """Write this process's snapshot for other workers to aggregate"""
+    directory = _multiproc_dir()
+    if directory is None:
+        return
+    snapshot = registry.snapshot()
+    if not any(snapshot.values()):
+        # Nothing recorded yet (e.g. the gunicorn master); leave no file behind
+        return
+    pid = os.getpid()
+    if pid not in _snapshot_names:
+        _snapshot_names[pid] = f'metrics_{pid}_{time.time_ns()}.json'
+    directory.mkdir(parents=True, exist_ok=True)
+    _write(directory / _snapshot_names[pid], snapshot)
+    registry.last_flush = time.monotonic()
+
+
+def maybe_flush():
+    if not settings.METRICS_MULTIPROC_DIR:
+        return
+    if time.monotonic() - registry.last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+atexit.register(flush)
+
+
+def _merge(into, snapshot):
+    for name, series in snapshot.items():
+        if name not in METRICS:
+            continue
+        target = into.setdefault(name, {})
+        for labels, value in series.items():
+            current = target.get(labels)
+            if current is None:
+                target[labels] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                target[labels] = [a + b for a, b in zip(current, value)]
+            else:
+                target[labels] = current + value
+
+
+def _read_archive(directory):
+    try:
+        archive = json.loads((directory / ARCHIVE_NAME).read_text())
+    except (OSError, ValueError):
+        return {'files': [], 'metrics': {}}
+    return archive
+
+
+def archive_worker(pid):
+    """
+    Fold the snapshots of exited worker ``pid`` into the archive.
+
+    Called from the gunicorn master only, so the archive has one writer.
+    The archive lists the files it already holds, which lets ``collect``
+    skip them until they are removed, so nothing is counted twice.
+    """
+    directory = _multiproc_dir()
+    if directory is None:
+        return
+    paths = list(directory.glob(f'metrics_{pid}_*.json'))
+    if not paths:
+        return
+    archive = _read_archive(directory)
+    for path in paths:
+        try:
+            _merge(archive['metrics'], json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    existing = {path.name for path in directory.glob('metrics_*_*.json')}
+    archive['files'] = [name for name in archive['files'] if name in existing] + [path.name for path in paths]
+    _write(directory / ARCHIVE_NAME, archive)
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+def collect():
+    """Snapshot of every worker (or just this process without a multiproc dir)"""
+    directory = _multiproc_dir()
+    own = registry.snapshot()
+    if directory is None:
+        return own
+
+    workers = {}
+    own_file = _snapshot_names.get(os.getpid())
+    for path in directory.glob('metrics_*_*.json'):
+        if path.name == own_file:
+            continue
+        try:
+            workers[path.name] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+    # Read after the worker files: a file archived meanwhile is then listed in it
+    archive = _read_archive(directory)
+    merged = archive['metrics']
+    archived = set(archive['files'])
+    for name, snapshot in workers.items():
+        if name not in archived:
+            _merge(merged, snapshot)
+    _merge(merged, own)
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render_prometheus(snapshot):
+    """Render a snapshot in the Prometheus text exposition format"""
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        series = snapshot.get(name, {})
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(series.items()):
+            labels = json.loads(key)
+            if kind == 'counter':
+                lines.append(f'{name}{_labels(label_names, labels)} {value}')
+            elif kind == 'summary':
+                lines.append(f'{name}_count{_labels(label_names, labels)} {value[0]}')
+                lines.append(f'{name}_sum{_labels(label_names, labels)} {value[1]}')
+            else:
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else repr(float(bound))
+                    lines.append(f'{name}_bucket{_labels(label_names, labels, [("le", le)])} {cumulative}')
+                lines.append(f'{name}_count{_labels(label_names, labels)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(label_names, labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
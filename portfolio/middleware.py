@@ -0,0 +1,263 @@
+import itertools
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.backends.signals import connection_created
+from django.http import FileResponse
+from django.utils.cache import has_vary_header, patch_vary_headers
+
+from . import compression, metrics, profiling, routers
+from .snapshot import snapshot_store
+from .tenants import tenant_map
+
+logger = logging.getLogger(__name__)
+
+_queries = threading.local()
+
+
+def count_query(execute, sql, params, many, context):
+    """execute_wrapper that counts queries run by the current thread"""
+    _queries.count = getattr(_queries, 'count', 0) + 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    # Installed once per connection wrapper rather than per request, which
+    # keeps the per-request cost down to reading a thread-local counter
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+connection_created.connect(install_query_counter)
+
+
+def route_name(request):
+    """Metric label for the URL pattern that handled ``request``"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    if 'admin' in match.namespaces:
+        return 'admin'
+    return match.url_name or 'unnamed'
+
+
+class MetricsMiddleware:
+    """
+    Records latency, response size and DB query count per URL name.
+
+    Keep this first in MIDDLEWARE so the measured latency covers the whole
+    middleware stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries_before = getattr(_queries, 'count', 0)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        size = None if response.streaming else len(response.content)
+        metrics.observe_request(
+            route_name(request), request.method, response.status_code, elapsed, size,
+            getattr(_queries, 'count', 0) - queries_before,
+        )
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    Profiles requests on demand for staff, and 1-in-N requests continuously.
+
+    A staff user opts in per request with an ``X-Profile`` header or a
+    ``?_profile`` query parameter, whose value picks the mode (``sample``
+    or ``cprofile``). Must sit after AuthenticationMiddleware so the staff
+    check sees the logged-in user. Continuous profiles are kept in a ring
+    of the newest ``PROFILER_RING_SIZE`` rows. The ring is trimmed once
+    every ``PROFILER_TRIM_EVERY`` continuous profiles a worker stores, so
+    a sampled request usually costs a single INSERT.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.counter = itertools.count(1)
+        self.stored = itertools.count(1)
+
+    def _requested_mode(self, request):
+        flag = request.headers.get('X-Profile') or request.GET.get('_profile')
+        if flag is None or not request.user.is_staff:
+            return None
+        return flag if flag in profiling.MODES else 'sample'
+
+    def __call__(self, request):
+        mode = self._requested_mode(request)
+        trigger = 'staff'
+        if mode is None:
+            every = settings.PROFILER_SAMPLE_EVERY
+            if not every or next(self.counter) % every:
+                return self.get_response(request)
+            mode, trigger = 'sample', 'continuous'
+
+        def run():
+            response = self.get_response(request)
+            if response.streaming:
+                # Render streamed bodies inside the profiled region too
+                response.streaming_content = [b''.join(response.streaming_content)]
+            return response
+
+        response, report = profiling.profile(run, mode)
+        try:
+            self._store(request, response, report, mode, trigger)
+        except DatabaseError:
+            # Profiling is best effort; the page was served, so still return it
+            logger.warning('Could not store the profile of %s', request.path, exc_info=True)
+        return response
+
+    def _store(self, request, response, report, mode, trigger):
+        from .models import RequestProfile
+
+        username = ''
+        if trigger == 'staff':
+            # Only staff runs touch request.user: loading the session adds Vary: Cookie,
+            # which would make sampled public pages uncacheable
+            username = request.user.get_username() if request.user.is_authenticated else ''
+        RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:500],
+            route=route_name(request),
+            status_code=response.status_code,
+            duration_ms=report['duration'] * 1000,
+            trigger=trigger,
+            mode=mode,
+            username=username,
+            summary=report['summary'],
+            collapsed_stacks=report['collapsed'],
+        )
+        if trigger == 'continuous' and next(self.stored) % settings.PROFILER_TRIM_EVERY == 0:
+            stale = RequestProfile.objects.filter(trigger='continuous').order_by('-created_at', '-pk')
+            stale_ids = list(stale.values_list('pk', flat=True)[settings.PROFILER_RING_SIZE:])
+            if stale_ids:
+                RequestProfile.objects.filter(pk__in=stale_ids).delete()
+
+
+class TenantMiddleware:
+    """
+    Sets ``request.tenant`` to the Profile served on the request's host.
+
+    Must sit after CommonMiddleware, whose ``get_host()`` call has already
+    rejected hosts outside ALLOWED_HOSTS, so the raw header is safe to use.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # In snapshot mode the profiles come from the snapshot, not the database
+        snapshot = snapshot_store.current()
+        tenants = snapshot.tenants if snapshot is not None else tenant_map
+        request.tenant = tenants.resolve(request.META.get('HTTP_HOST', ''), settings.TENANT_CACHE_TTL)
+        return self.get_response(request)
+
+
+class ReplicaMiddleware:
+    """
+    Lets replica-safe public pages read from a replica.
+
+    GET/HEAD requests for the views in ``REPLICA_VIEWS`` read portfolio
+    data from a replica. Any other request method that succeeds sets a
+    short-lived cookie that keeps that client's reads on the primary for
+    ``REPLICA_PIN_SECONDS``, so they see their own writes despite
+    replication lag. Streamed response bodies are rendered after the
+    middleware returns and read from the primary.
+    """
+
+    PIN_COOKIE = 'db_pin'
+    SAFE_METHODS = ('GET', 'HEAD')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.views = frozenset(settings.REPLICA_VIEWS)
+        self.enabled = bool(routers.replica_aliases())
+
+    def __call__(self, request):
+        request._replica_token = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if request._replica_token is not None:
+                routers.use_primary(request._replica_token)
+
+        if self.enabled and request.method not in self.SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                self.PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            self.enabled
+            and request.method in self.SAFE_METHODS
+            and request.resolver_match.url_name in self.views
+            and self.PIN_COOKIE not in request.COOKIES
+        ):
+            request._replica_token = routers.use_replica()
+
+
+class CompressionMiddleware:
+    """
+    Compresses dynamic responses with brotli or gzip.
+
+    Sits right after MetricsMiddleware, so the recorded response size is
+    the number of bytes actually sent. Static files are left to WhiteNoise,
+    which serves them pre-compressed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.has_header('Content-Encoding')
+            or isinstance(response, FileResponse)
+            or not response.get('Content-Type', '').startswith(compression.COMPRESSIBLE_TYPES)
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        # Per-user bodies (CSRF token, session data) vary on Cookie and must be padded
+        has_secret = has_vary_header(response, 'Cookie')
+        encoding = compression.choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), padded=has_secret)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if has_secret:
+                response.streaming_content = compression.compress_stream_padded(response.streaming_content)
+            else:
+                response.streaming_content = compression.compress_stream(response.streaming_content, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.content
+            if len(body) < settings.COMPRESSION_MIN_LENGTH:
+                return response
+            if has_secret:
+                compressed = compression.compress_padded(body)
+            else:
+                compressed = compression.compress_cached(body, encoding)
+            if len(compressed) >= len(body):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # The compressed representation is no longer byte-identical
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+def spread_content_order(apps, schema_editor):
+    """Move existing blocks onto the sparse 1024-step grid"""
+    ProjectContent = apps.get_model('portfolio', 'ProjectContent')
+    project_ids = ProjectContent.objects.values_list('project_id', flat=True).distinct()
+    for project_id in project_ids:
+        blocks = list(ProjectContent.objects.filter(project_id=project_id).order_by('order', 'pk'))
+        for index, block in enumerate(blocks):
+            block.order = (index + 1) * 1024
+        ProjectContent.objects.bulk_update(blocks, ['order'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0002_remove_profile_cv_profile_cv_url'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='projectcontent',
+            name='order',
+            field=models.IntegerField(default=0, help_text='Blocks are spaced 1024 apart; lower numbers appear first'),
+        ),
+        migrations.AddIndex(
+            model_name='projectcontent',
+            index=models.Index(fields=['project', 'order'], name='portfolio_p_project_b4c0d1_idx'),
+        ),
+        migrations.RunPython(spread_content_order, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_sparse_content_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectcontent',
+            name='markdown_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projectcontent',
+            name='markdown_source',
+            field=models.TextField(blank=True, help_text='Markdown source, compiled to HTML on save'),
+        ),
+        migrations.AddField(
+            model_name='projectcontent',
+            name='markdown_toc',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='projectcontent',
+            name='content_type',
+            field=models.CharField(choices=[('text', 'Text'), ('image', 'Image'), ('quote', 'Quote'), ('code', 'Code'), ('markdown', 'Markdown')], max_length=10),
+        ),
+    ]
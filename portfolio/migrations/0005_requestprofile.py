@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_projectcontent_markdown'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('route', models.CharField(blank=True, max_length=100)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('trigger', models.CharField(choices=[('staff', 'Staff request'), ('continuous', 'Continuous sampling')], max_length=20)),
+                ('mode', models.CharField(choices=[('sample', 'Stack sampling'), ('cprofile', 'cProfile')], max_length=20)),
+                ('username', models.CharField(blank=True, max_length=150)),
+                ('summary', models.TextField(blank=True)),
+                ('collapsed_stacks', models.TextField(blank=True, help_text='Collapsed stacks for flamegraph.pl or speedscope')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
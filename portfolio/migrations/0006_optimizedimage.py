@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0005_requestprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptimizedImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original', models.CharField(max_length=255, unique=True)),
+                ('optimized', models.CharField(max_length=255)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('original_bytes', models.PositiveIntegerField(default=0)),
+                ('optimized_bytes', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
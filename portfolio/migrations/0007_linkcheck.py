@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0006_optimizedimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, unique=True)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('ok', models.BooleanField(default=False)),
+                ('error', models.CharField(blank=True, max_length=300)),
+                ('response_ms', models.FloatField(default=0)),
+                ('checked_at', models.DateTimeField()),
+                ('projects', models.ManyToManyField(blank=True, related_name='link_checks', to='portfolio.project')),
+            ],
+            options={
+                'ordering': ['ok', 'url'],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def assign_default_portfolio(apps, schema_editor):
+    """Give existing rows to the original single profile"""
+    Profile = apps.get_model('portfolio', 'Profile')
+    profile = Profile.objects.order_by('pk').first()
+    if profile is None:
+        return
+    for name in ('Skill', 'Project', 'Education', 'Experience', 'ContactMessage'):
+        apps.get_model('portfolio', name).objects.filter(profile__isnull=True).update(profile=profile)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0007_linkcheck'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='profile',
+            options={'verbose_name': 'Profile', 'verbose_name_plural': 'Profiles'},
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='portfolio.profile'),
+        ),
+        migrations.AddField(
+            model_name='education',
+            name='profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='education', to='portfolio.profile'),
+        ),
+        migrations.AddField(
+            model_name='experience',
+            name='profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='experience', to='portfolio.profile'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='domain',
+            field=models.CharField(blank=True, help_text='Host name this portfolio is served on (e.g. jane.example.com). Leave blank for the default portfolio, shown on any other host.', max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='projects', to='portfolio.profile'),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='skills', to='portfolio.profile'),
+        ),
+        migrations.RunPython(assign_default_portfolio, migrations.RunPython.noop),
+    ]
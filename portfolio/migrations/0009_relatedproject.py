@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0008_multi_portfolio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_entries', to='portfolio.project')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='portfolio.project')),
+            ],
+            options={
+                'ordering': ['project', 'rank'],
+                'indexes': [models.Index(fields=['project', 'rank'], name='portfolio_r_project_8af0e2_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedproject',
+            constraint=models.UniqueConstraint(fields=('project', 'related'), name='unique_related_project'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0009_relatedproject'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingFileDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Storage name of the file', max_length=255, unique=True)),
+                ('source', models.CharField(blank=True, help_text='Model field that held the file', max_length=100)),
+                ('reason', models.CharField(choices=[('replaced', 'Replaced'), ('deleted', 'Owner deleted'), ('orphan', 'Orphan scan')], max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['next_attempt_at'], name='portfolio_p_next_at_b3b262_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:31
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+BATCH_SIZE = 1000
+
+
+def _truncate(text, length):
+    return text[:length] + '...' if len(text) > length else text
+
+
+def block_preview(block):
+    """Frozen copy of portfolio.rendering.block_preview as of this migration"""
+    if block.content_type == 'text':
+        return _truncate(strip_tags(block.text_content or ''), 100)
+    if block.content_type == 'image':
+        return _truncate(block.image_caption or 'No image', 100)
+    if block.content_type == 'quote':
+        return f'"{_truncate(block.quote_text or "", 80)}"'
+    if block.content_type == 'code':
+        return block.code_language or 'Code'
+    if block.content_type == 'markdown':
+        return _truncate(block.markdown_source or '', 100)
+    return ''
+
+
+def store_previews(apps, schema_editor):
+    """Compute the stored preview of existing blocks, in batches"""
+    ProjectContent = apps.get_model('portfolio', 'ProjectContent')
+    blocks = ProjectContent.objects.only(
+        'content_type', 'text_content', 'image_caption', 'quote_text', 'code_language', 'markdown_source',
+    )
+    batch = []
+    for block in blocks.iterator(chunk_size=BATCH_SIZE):
+        block.preview = block_preview(block)
+        batch.append(block)
+        if len(batch) == BATCH_SIZE:
+            ProjectContent.objects.bulk_update(batch, ['preview'])
+            batch = []
+    if batch:
+        ProjectContent.objects.bulk_update(batch, ['preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0010_pendingfiledeletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectcontent',
+            name='preview',
+            field=models.CharField(blank=True, editable=False, max_length=120),
+        ),
+        migrations.RunPython(store_previews, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['-created_at'], name='portfolio_c_created_781b2b_idx'),
+        ),
+    ]
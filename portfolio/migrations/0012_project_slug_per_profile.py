@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0011_contentpreview'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='slug',
+            field=models.SlugField(blank=True, help_text='Unique within the portfolio'),
+        ),
+        migrations.AddConstraint(
+            model_name='project',
+            constraint=models.UniqueConstraint(fields=('profile', 'slug'), name='unique_project_slug_per_profile'),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 from ckeditor_uploader.fields import RichTextUploadingField
 
+from .images import rewrite_images
+from .rendering import block_preview, compile_markdown
+
 
 class Profile(models.Model):
     """Model for personal profile information"""
@@ -14,17 +18,28 @@ class Profile(models.Model):
     linkedin = models.URLField(blank=True)
     twitter = models.URLField(blank=True)
     cv_url = models.URLField(blank=True, help_text="Link to CV (Google Drive, Dropbox, etc.)")
+    domain = models.CharField(
+        max_length=255, unique=True, null=True, blank=True,
+        help_text="Host name this portfolio is served on (e.g. jane.example.com). "
+                  "Leave blank for the default portfolio, shown on any other host.",
+    )
+    
+    def save(self, *args, **kwargs):
+        # Hosts are matched lower-cased; store blanks as NULL so several can be blank
+        self.domain = (self.domain or '').strip().lower() or None
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return self.name
     
     class Meta:
         verbose_name = "Profile"
-        verbose_name_plural = "Profile"
+        verbose_name_plural = "Profiles"
 
 
 class Skill(models.Model):
     """Model for skills"""
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='skills', null=True, blank=True)
     name = models.CharField(max_length=100)
     proficiency = models.IntegerField(default=50, help_text="Proficiency level (0-100)")
     category = models.CharField(max_length=50, choices=[
@@ -45,8 +60,9 @@ class Skill(models.Model):
 
 class Project(models.Model):
     """Model for portfolio projects"""
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='projects', null=True, blank=True)
     title = models.CharField(max_length=200)
-    slug = models.SlugField(unique=True, blank=True)
+    slug = models.SlugField(blank=True, help_text="Unique within the portfolio")
     short_description = models.TextField(max_length=300)
     featured_image = models.ImageField(upload_to='projects/')
     
@@ -78,8 +94,40 @@ class Project(models.Model):
     def get_technologies_list(self):
         return [tech.strip() for tech in self.technologies.split(',')]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the related-projects index tell whether technologies or the portfolio changed on save
+        instance._loaded_technologies = instance.__dict__.get('technologies')
+        if 'profile_id' in instance.__dict__:
+            instance._loaded_profile_id = instance.profile_id
+        return instance
+    
     class Meta:
         ordering = ['order', '-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'slug'], name='unique_project_slug_per_profile'),
+        ]
+
+
+class RelatedProject(models.Model):
+    """Precomputed top-K similar projects by weighted technology overlap"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    def __str__(self):
+        return f"{self.project} -> {self.related} ({self.score:.2f})"
+    
+    class Meta:
+        ordering = ['project', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'related'], name='unique_related_project'),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'rank']),
+        ]
 
 
 class ProjectContent(models.Model):
@@ -89,11 +137,14 @@ class ProjectContent(models.Model):
         ('image', 'Image'),
         ('quote', 'Quote'),
         ('code', 'Code'),
+        ('markdown', 'Markdown'),
     ]
+    # Fields the stored admin preview is built from
+    PREVIEW_SOURCE_FIELDS = {'content_type', 'text_content', 'image_caption', 'quote_text', 'code_language', 'markdown_source'}
     
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='content_blocks')
     content_type = models.CharField(max_length=10, choices=CONTENT_TYPE_CHOICES)
-    order = models.IntegerField(default=0)
+    order = models.IntegerField(default=0, help_text="Blocks are spaced 1024 apart; lower numbers appear first")
     
     # Content fields
     text_content = RichTextUploadingField(blank=True)
@@ -103,16 +154,55 @@ class ProjectContent(models.Model):
     quote_author = models.CharField(max_length=100, blank=True)
     code_content = models.TextField(blank=True)
     code_language = models.CharField(max_length=50, blank=True, default='python')
+    markdown_source = models.TextField(blank=True, help_text="Markdown source, compiled to HTML on save")
+    
+    # Compiled from markdown_source on save; never rendered from source per request
+    markdown_html = models.TextField(blank=True, editable=False)
+    markdown_toc = models.TextField(blank=True, editable=False)
+    
+    # Admin changelist summary, stored on save so the list never loads the large columns
+    preview = models.CharField(max_length=120, blank=True, editable=False)
+    
+    def render_markdown(self):
+        """Compile markdown_source into the stored HTML and table of contents"""
+        if self.content_type == 'markdown':
+            self.markdown_html, self.markdown_toc = compile_markdown(self.markdown_source)
+        else:
+            self.markdown_html = self.markdown_toc = ''
+    
+    def render_preview(self):
+        self.preview = block_preview(self)
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.content_type == 'text' and (update_fields is None or 'text_content' in update_fields):
+            # Point embedded uploads at their optimized copies when available
+            self.text_content = rewrite_images(self.text_content)
+        if update_fields is None:
+            self.render_markdown()
+        elif {'content_type', 'markdown_source'} & set(update_fields):
+            self.render_markdown()
+            kwargs['update_fields'] = set(update_fields) | {'markdown_html', 'markdown_toc'}
+        if update_fields is None:
+            self.render_preview()
+        elif self.PREVIEW_SOURCE_FIELDS & set(update_fields):
+            self.render_preview()
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'preview'}
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.project.title} - {self.content_type} #{self.order}"
     
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['project', 'order']),
+        ]
 
 
 class Education(models.Model):
     """Model for education history"""
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='education', null=True, blank=True)
     degree = models.CharField(max_length=200)
     institution = models.CharField(max_length=200, default="University of Hildesheim")
     field_of_study = models.CharField(max_length=200, default="Software Engineering")
@@ -131,6 +221,7 @@ class Education(models.Model):
 
 class Experience(models.Model):
     """Model for work experience"""
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='experience', null=True, blank=True)
     title = models.CharField(max_length=200)
     company = models.CharField(max_length=200)
     location = models.CharField(max_length=200, blank=True)
@@ -148,6 +239,7 @@ class Experience(models.Model):
 
 class ContactMessage(models.Model):
     """Model for contact form messages"""
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='messages', null=True, blank=True)
     name = models.CharField(max_length=100)
     email = models.EmailField()
     subject = models.CharField(max_length=200)
@@ -159,4 +251,94 @@ class ContactMessage(models.Model):
         return f"Message from {self.name} - {self.subject}"
     
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+        ]
+
+
+class RequestProfile(models.Model):
+    """Profile of a single request, captured on demand or by continuous sampling"""
+    TRIGGER_CHOICES = [
+        ('staff', 'Staff request'),
+        ('continuous', 'Continuous sampling'),
+    ]
+    MODE_CHOICES = [
+        ('sample', 'Stack sampling'),
+        ('cprofile', 'cProfile'),
+    ]
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    route = models.CharField(max_length=100, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES)
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES)
+    username = models.CharField(max_length=150, blank=True)
+    summary = models.TextField(blank=True)
+    collapsed_stacks = models.TextField(blank=True, help_text="Collapsed stacks for flamegraph.pl or speedscope")
+    
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+    
+    class Meta:
+        ordering = ['-created_at']
+
+
+class OptimizedImage(models.Model):
+    """Resized, metadata-free copy of a CKEditor upload"""
+    original = models.CharField(max_length=255, unique=True)
+    optimized = models.CharField(max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    original_bytes = models.PositiveIntegerField(default=0)
+    optimized_bytes = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.original
+
+
+class LinkCheck(models.Model):
+    """Latest health check of an external URL used by one or more projects"""
+    url = models.URLField(max_length=500, unique=True)
+    projects = models.ManyToManyField(Project, related_name='link_checks', blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    ok = models.BooleanField(default=False)
+    error = models.CharField(max_length=300, blank=True)
+    response_ms = models.FloatField(default=0)
+    checked_at = models.DateTimeField()
+    
+    def __str__(self):
+        return self.url
+    
+    class Meta:
+        ordering = ['ok', 'url']
+
+
+class PendingFileDeletion(models.Model):
+    """Media file queued for deletion by the delete_pending_files command"""
+    REASON_CHOICES = [
+        ('replaced', 'Replaced'),
+        ('deleted', 'Owner deleted'),
+        ('orphan', 'Orphan scan'),
+    ]
+    
+    name = models.CharField(max_length=255, unique=True, help_text="Storage name of the file")
+    source = models.CharField(max_length=100, blank=True, help_text="Model field that held the file")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return self.name
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['next_attempt_at']),
+        ]
@@ -0,0 +1,130 @@
+"""
+Sparse ordering for ProjectContent blocks.
+
+Blocks are spaced ORDER_STEP apart so a block can be dropped between two
+neighbours by taking the midpoint, without touching any other row. When a
+gap runs out the project's blocks are rebalanced back onto the grid.
+Every rewrite of a project's order is a single bulk UPDATE in a transaction.
+"""
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Min, Value, When
+
+from .models import Project, ProjectContent
+from .purge import project_key, purge_keys
+
+ORDER_STEP = 1024
+
+
+def next_order(project):
+    """Order value that places a new block after the current last block"""
+    max_order = project.content_blocks.aggregate(Max('order'))['order__max']
+    if max_order is None:
+        return ORDER_STEP
+    return max_order + ORDER_STEP
+
+
+def order_between(before, after):
+    """Midpoint between two order values, or None when there is no gap left"""
+    if before is None and after is None:
+        return ORDER_STEP
+    if before is None:
+        return after - ORDER_STEP
+    if after is None:
+        return before + ORDER_STEP
+    if after - before < 2:
+        return None
+    return (before + after) // 2
+
+
+def apply_order(project, block_ids):
+    """
+    Renumber a project's blocks so they follow ``block_ids``.
+
+    Blocks of the project that are missing from ``block_ids`` keep their
+    relative order and are appended after the listed ones. Returns a dict
+    mapping block id to its new order value.
+    """
+    block_ids = [int(pk) for pk in block_ids]
+    with transaction.atomic():
+        existing = list(
+            ProjectContent.objects.select_for_update()
+            .filter(project=project)
+            .order_by('order', 'pk')
+            .values_list('pk', flat=True)
+        )
+        known = set(existing)
+        unknown = [pk for pk in block_ids if pk not in known]
+        if unknown:
+            raise ValueError(f'Blocks {unknown} do not belong to project {project.pk}')
+
+        listed = list(dict.fromkeys(block_ids))
+        listed_set = set(listed)
+        sequence = listed + [pk for pk in existing if pk not in listed_set]
+        orders = {pk: (index + 1) * ORDER_STEP for index, pk in enumerate(sequence)}
+        if orders:
+            ProjectContent.objects.filter(project=project, pk__in=orders).update(
+                order=Case(
+                    *[When(pk=pk, then=Value(order)) for pk, order in orders.items()],
+                    output_field=IntegerField(),
+                )
+            )
+            # A bulk UPDATE sends no post_save, so purge the page explicitly
+            purge_keys([project_key(project.pk)])
+    return orders
+
+
+def rebalance(project):
+    """Put a project's blocks back onto the ORDER_STEP grid"""
+    return apply_order(project, [])
+
+
+def needs_rebalance(project):
+    """True when blocks share an order value or sit too close to split"""
+    orders = list(project.content_blocks.order_by('order').values_list('order', flat=True))
+    return any(b - a < 2 for a, b in zip(orders, orders[1:]))
+
+
+def insert_after(block, anchor):
+    """Give ``block`` an order value directly after ``anchor`` in the same project"""
+    following = (
+        ProjectContent.objects.filter(project_id=anchor.project_id, order__gt=anchor.order)
+        .exclude(pk=block.pk)
+        .aggregate(Min('order'))['order__min']
+    )
+    order = order_between(anchor.order, following)
+    if order is None:
+        rebalance(anchor.project)
+        anchor.refresh_from_db(fields=['order'])
+        following = (
+            ProjectContent.objects.filter(project_id=anchor.project_id, order__gt=anchor.order)
+            .exclude(pk=block.pk)
+            .aggregate(Min('order'))['order__min']
+        )
+        order = order_between(anchor.order, following)
+    block.order = order
+    return order
+
+
+def move_blocks(queryset, to_top=True):
+    """
+    Move the selected blocks to the top (or bottom) of their projects.
+
+    Selected blocks keep their relative order. Each affected project is
+    rewritten with one bulk UPDATE.
+    """
+    selected = {}
+    for project_id, pk in queryset.order_by('order', 'pk').values_list('project_id', 'pk'):
+        selected.setdefault(project_id, []).append(pk)
+
+    for project_id, pks in selected.items():
+        current = list(
+            ProjectContent.objects.filter(project_id=project_id)
+            .order_by('order', 'pk')
+            .values_list('pk', flat=True)
+        )
+        picked = set(pks)
+        rest = [pk for pk in current if pk not in picked]
+        sequence = pks + rest if to_top else rest + pks
+        apply_order(Project(pk=project_id), sequence)
+    return sum(len(pks) for pks in selected.values())
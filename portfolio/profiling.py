@@ -0,0 +1,123 @@
+"""
+Request profilers used by ProfilerMiddleware.
+
+``sample`` runs a background thread that snapshots the request thread's
+stack every ``PROFILER_SAMPLE_INTERVAL`` seconds and folds the stacks into
+collapsed-stack lines (``frame;frame;frame count``) ready for flamegraph.pl
+or speedscope. ``cprofile`` runs the deterministic profiler and keeps a
+pstats top-N summary; it is more precise per call but slows the request
+down considerably.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+MODES = ('sample', 'cprofile')
+
+
+def _short_path(filename):
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        return os.path.relpath(filename, base)
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename)
+
+
+class StackSampler:
+    """Samples one thread's stack from a helper thread"""
+
+    def __init__(self, interval, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+        self._labels = {}
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f'{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})'
+        return label
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[';'.join(stack)] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+    def summary(self, limit):
+        """Top functions by self samples and by inclusive samples"""
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        total = self.samples or 1
+        lines = [f'{self.samples} samples every {self.interval * 1000:.1f} ms', '', 'Self:']
+        lines += [f'  {count / total:6.1%}  {frame}' for frame, count in own.most_common(limit)]
+        lines += ['', 'Inclusive:']
+        lines += [f'  {count / total:6.1%}  {frame}' for frame, count in inclusive.most_common(limit)]
+        return '\n'.join(lines)
+
+
+def profile(func, mode='sample'):
+    """
+    Run ``func()`` under the chosen profiler.
+
+    Returns ``(result, report)`` where ``report`` holds ``duration``,
+    ``summary`` and ``collapsed`` (empty for cProfile).
+    """
+    limit = settings.PROFILER_TOP_N
+    start = time.perf_counter()
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        result = profiler.runcall(func)
+        duration = time.perf_counter() - start
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        return result, {'duration': duration, 'summary': out.getvalue(), 'collapsed': ''}
+
+    sampler = StackSampler(settings.PROFILER_SAMPLE_INTERVAL)
+    sampler.start()
+    try:
+        result = func()
+    finally:
+        sampler.stop()
+    duration = time.perf_counter() - start
+    return result, {
+        'duration': duration,
+        'summary': sampler.summary(limit),
+        'collapsed': sampler.collapsed(),
+    }
@@ -0,0 +1,180 @@
+"""
+Surrogate keys and targeted purging of downstream caches.
+
+Public responses list the content they were built from in ``Surrogate-Key``
+(space-separated, Fastly/Varnish style) and ``Cache-Tag`` (comma-separated,
+Cloudflare style) headers, e.g. ``profile-1 projects-1 project-42``. Keys
+of list-style content are scoped to the portfolio they belong to.
+
+When a model is saved or deleted, the keys it invalidates are queued once
+the transaction commits. A background thread waits ``PURGE_DEBOUNCE``
+seconds after the first key so bursts of edits (an admin save with a dozen
+inlines) collapse into one request, then POSTs ``{"keys": [...]}`` in
+batches of ``PURGE_BATCH_SIZE`` to ``PURGE_URL``. Nothing is queued while
+``PURGE_URL`` is empty.
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+# ---------------------------------------------------------------------------
+# Keys
+# ---------------------------------------------------------------------------
+
+def profile_key(profile_id):
+    """Key carried by every page of a portfolio"""
+    return f'profile-{profile_id}'
+
+
+def project_key(project_id):
+    return f'project-{project_id}'
+
+
+def page_keys(page, tenant, project=None):
+    """Surrogate keys for a public page"""
+    pid = tenant.pk if tenant is not None else 0
+    keys = [profile_key(pid)]
+    if page == 'index':
+        keys += [f'skills-{pid}', f'projects-{pid}', f'education-{pid}', f'experience-{pid}']
+    elif page == 'projects':
+        keys.append(f'projects-{pid}')
+    elif page == 'project':
+        keys.append(project_key(project.pk))
+    return keys
+
+
+def instance_keys(instance):
+    """Keys whose pages change when ``instance`` is saved or deleted"""
+    from .models import Education, Experience, Profile, Project, ProjectContent, Skill
+
+    if isinstance(instance, Profile):
+        return [profile_key(instance.pk)]
+    if isinstance(instance, ProjectContent):
+        return [project_key(instance.project_id)]
+    pid = getattr(instance, 'profile_id', None) or 0
+    if isinstance(instance, Project):
+        return [project_key(instance.pk), f'projects-{pid}']
+    if isinstance(instance, Skill):
+        return [f'skills-{pid}']
+    if isinstance(instance, Education):
+        return [f'education-{pid}']
+    if isinstance(instance, Experience):
+        return [f'experience-{pid}']
+    return []
+
+
+def set_surrogate_keys(response, keys):
+    response.headers['Surrogate-Key'] = ' '.join(keys)
+    response.headers['Cache-Tag'] = ','.join(keys)
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Dispatch
+# ---------------------------------------------------------------------------
+
+class PurgeDispatcher:
+    """Collects keys and sends them to the purge endpoint from a daemon thread"""
+
+    def __init__(self):
+        self.pending = set()
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def enqueue(self, keys):
+        with self.condition:
+            self.pending.update(keys)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='purge-dispatcher', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def _take(self, debounce):
+        """Wait for a first key, let the burst settle, then take everything pending"""
+        with self.condition:
+            while not self.pending:
+                self.condition.wait()
+        time.sleep(debounce)
+        with self.condition:
+            keys, self.pending = self.pending, set()
+        return keys
+
+    def _run(self):
+        while True:
+            keys = self._take(settings.PURGE_DEBOUNCE)
+            if keys:
+                self.send(keys)
+
+    def flush(self):
+        """Send whatever is pending now; runs at exit so commands don't drop purges"""
+        with self.condition:
+            keys, self.pending = self.pending, set()
+        if keys:
+            self.send(keys)
+
+    def send(self, keys):
+        keys = sorted(keys)
+        size = settings.PURGE_BATCH_SIZE
+        for start in range(0, len(keys), size):
+            self._post(keys[start:start + size])
+
+    def _post(self, batch):
+        headers = {'Content-Type': 'application/json'}
+        if settings.PURGE_TOKEN:
+            headers['Authorization'] = f'Bearer {settings.PURGE_TOKEN}'
+        body = json.dumps({'keys': batch}).encode()
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            request = urllib.request.Request(settings.PURGE_URL, data=body, headers=headers, method='POST')
+            try:
+                with urllib.request.urlopen(request, timeout=settings.PURGE_TIMEOUT):
+                    pass
+                metrics.registry.inc('portfolio_purge_requests_total', ('ok',))
+                logger.info('Purged %d surrogate key(s)', len(batch))
+                return True
+            except (urllib.error.URLError, OSError, ValueError) as exc:
+                if attempt == MAX_ATTEMPTS:
+                    metrics.registry.inc('portfolio_purge_requests_total', ('failed',))
+                    logger.warning('Purge of %d key(s) failed: %s', len(batch), exc)
+                    return False
+                time.sleep(0.5 * 2 ** attempt)
+
+
+dispatcher = PurgeDispatcher()
+atexit.register(dispatcher.flush)
+
+
+def purge_keys(keys):
+    """Queue ``keys`` for purging once the current transaction commits"""
+    keys = list(keys)
+    if keys and settings.PURGE_URL:
+        transaction.on_commit(lambda: dispatcher.enqueue(keys))
+
+
+def purge_instance(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    purge_keys(instance_keys(instance))
+
+
+def connect_signals():
+    from .models import Education, Experience, Profile, Project, ProjectContent, Skill
+
+    for model in (Profile, Skill, Project, ProjectContent, Education, Experience):
+        post_save.connect(purge_instance, sender=model, dispatch_uid=f'purge-save-{model.__name__}')
+        post_delete.connect(purge_instance, sender=model, dispatch_uid=f'purge-delete-{model.__name__}')
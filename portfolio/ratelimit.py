@@ -0,0 +1,122 @@
+"""
+Cache-backed rate limiting for public POST endpoints.
+
+Each limit allows ``limit`` hits per ``period`` seconds with bursts of up
+to ``limit`` — the same budget as a token bucket of ``limit`` tokens that
+refills over ``period``. It is kept as a sliding-window counter (the
+current and previous fixed windows, weighted by how far into the current
+window we are) because that needs nothing but ``cache.add``/``cache.incr``.
+Those are atomic on Redis and Memcached, so the limiter stays correct
+across gunicorn workers without locks or read-modify-write races.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .tenants import tenant_cache_key
+
+KEY_PREFIX = 'rl'
+
+
+def parse_rate(rate):
+    """Parse ``"<count>/<seconds>"`` into ``(count, seconds)``"""
+    count, seconds = rate.split('/', 1)
+    return int(count), int(seconds)
+
+
+class RateLimit:
+    """A named limit of ``limit`` hits per ``period`` seconds per key"""
+
+    def __init__(self, name, rate, cache_alias='default'):
+        self.name = name
+        self.limit, self.period = parse_rate(rate)
+        self.cache_alias = cache_alias
+
+    def _key(self, key, window):
+        return f'{KEY_PREFIX}:{self.name}:{key}:{window}'
+
+    def hit(self, key, now=None):
+        """
+        Count one hit for ``key``.
+
+        Returns ``(allowed, retry_after)`` where ``retry_after`` is the
+        number of seconds until the estimate drops back under the limit.
+        """
+        cache = caches[self.cache_alias]
+        now = time.time() if now is None else now
+        window, offset = divmod(now, self.period)
+        window = int(window)
+        current_key = self._key(key, window)
+
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # First hit in this window; add() loses gracefully to a concurrent worker
+            cache.add(current_key, 0, timeout=self.period * 2)
+            current = cache.incr(current_key)
+        previous = cache.get(self._key(key, window - 1), 0)
+
+        weight = 1 - offset / self.period
+        estimated = previous * weight + current
+        if estimated <= self.limit:
+            return True, 0
+        return False, max(1, int(self.period - offset))
+
+
+def client_ip(request):
+    """
+    Client address as seen by the outermost trusted proxy.
+
+    With ``RATELIMIT_PROXY_COUNT`` proxies in front of the app, the client
+    is the entry that many places from the right of X-Forwarded-For; any
+    entries further left were supplied by the client and can't be trusted.
+    """
+    proxies = getattr(settings, 'RATELIMIT_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(proxies, len(hops))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def contact_limits():
+    rates = settings.CONTACT_RATE_LIMITS
+    return (
+        RateLimit('contact-global', rates['global']),
+        RateLimit('contact-ip', rates['ip']),
+        RateLimit('contact-email', rates['email']),
+    )
+
+
+def check_contact_rate(request):
+    """
+    Apply the contact form limits before any validation or DB work.
+
+    The global limit is checked first so a flood is shed after two cache
+    operations per request. Returns a 429 response when a limit is
+    exceeded, otherwise None. Counters are kept per portfolio, so a flood
+    aimed at one doesn't close the contact form of the others.
+    """
+    global_limit, ip_limit, email_limit = contact_limits()
+    checks = [(global_limit, 'all'), (ip_limit, client_ip(request))]
+    email = request.POST.get('email', '').strip().lower()
+    if email:
+        # Hashed so keys stay memcached-safe and addresses aren't stored in the cache
+        checks.append((email_limit, hashlib.sha256(email.encode()).hexdigest()[:32]))
+
+    tenant = getattr(request, 'tenant', None)
+    for limit, key in checks:
+        allowed, retry_after = limit.hit(tenant_cache_key(tenant, key))
+        if not allowed:
+            return HttpResponse(
+                'Too many messages. Please try again later.',
+                status=429,
+                content_type='text/plain; charset=utf-8',
+                headers={'Retry-After': str(retry_after)},
+            )
+    return None
@@ -0,0 +1,176 @@
+"""
+Related-projects index.
+
+Projects are compared within a portfolio by weighted Jaccard overlap of
+their technologies: each technology is weighted by its inverse document
+frequency, ``log(1 + N / df)``, so sharing a rare technology counts for
+more than sharing one every project lists. The top ``RELATED_PROJECTS_COUNT``
+matches of every project are stored as RelatedProject rows, and
+``project_detail`` reads them with one query.
+
+``rebuild`` recomputes a whole portfolio with a vectorized matrix product.
+``refresh`` runs when one project's technologies change. It recomputes
+that project and the projects sharing a technology with its old or new
+set. Other projects keep their lists even though the idf weights shift
+slightly, until the next ``rebuild``.
+"""
+
+import math
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Project, RelatedProject
+from .purge import project_key, purge_keys
+
+
+def technology_set(technologies):
+    """Normalized technologies of a comma-separated string"""
+    return frozenset(tech.strip().lower() for tech in (technologies or '').split(',') if tech.strip())
+
+
+def idf_weights(tech_sets):
+    document_frequency = {}
+    for techs in tech_sets:
+        for tech in techs:
+            document_frequency[tech] = document_frequency.get(tech, 0) + 1
+    total = len(tech_sets)
+    return {tech: math.log(1 + total / df) for tech, df in document_frequency.items()}
+
+
+def _top(scores, k):
+    scores.sort(key=lambda item: (-item[1], item[0]))
+    return scores[:k]
+
+
+def top_k_vectorized(ids, tech_sets, k):
+    """``{id: [(related_id, score), ...]}`` for every project, in one pass"""
+    if not ids:
+        return {}
+    vocabulary = {tech: index for index, tech in enumerate(sorted(set().union(*tech_sets)))}
+    weights = idf_weights(tech_sets)
+    membership = np.zeros((len(ids), len(vocabulary)), dtype=np.float64)
+    for row, techs in enumerate(tech_sets):
+        for tech in techs:
+            membership[row, vocabulary[tech]] = 1.0
+    weight_vector = np.array([weights[tech] for tech in sorted(vocabulary, key=vocabulary.get)])
+
+    weighted = membership * weight_vector
+    intersection = weighted @ membership.T
+    totals = weighted.sum(axis=1)
+    union = totals[:, None] + totals[None, :] - intersection
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = np.where(union > 0, intersection / union, 0.0)
+    np.fill_diagonal(similarity, 0.0)
+
+    result = {}
+    count = min(k, len(ids) - 1)
+    for row, project_id in enumerate(ids):
+        if count <= 0:
+            result[project_id] = []
+            continue
+        candidates = np.argpartition(-similarity[row], count - 1)[:count]
+        scores = [(ids[col], float(similarity[row, col])) for col in candidates if similarity[row, col] > 0]
+        result[project_id] = _top(scores, k)
+    return result
+
+
+def top_k_for(project_id, techs_by_id, weights, k, candidates=None):
+    """Top ``k`` matches of one project, comparing only ``candidates`` (default: all)"""
+    techs = techs_by_id[project_id]
+    scores = []
+    for other_id in (candidates if candidates is not None else techs_by_id):
+        if other_id == project_id:
+            continue
+        other = techs_by_id[other_id]
+        shared = techs & other
+        if not shared:
+            continue
+        union = sum(weights[tech] for tech in techs | other)
+        scores.append((other_id, sum(weights[tech] for tech in shared) / union))
+    return _top(scores, k)
+
+
+def _load(profile_id):
+    rows = Project.objects.filter(profile_id=profile_id).order_by('pk').values_list('pk', 'technologies')
+    return {pk: technology_set(technologies) for pk, technologies in rows}
+
+
+def _store(results):
+    """Replace the stored lists of the projects in ``results``"""
+    rows = [
+        RelatedProject(project_id=project_id, related_id=related_id, score=score, rank=rank)
+        for project_id, matches in results.items()
+        for rank, (related_id, score) in enumerate(matches, start=1)
+    ]
+    with transaction.atomic():
+        RelatedProject.objects.filter(project_id__in=list(results)).delete()
+        RelatedProject.objects.bulk_create(rows, batch_size=500)
+        purge_keys(project_key(project_id) for project_id in results)
+    return len(rows)
+
+
+def rebuild(profile_id):
+    """Recompute every project of a portfolio; returns the number of rows stored"""
+    techs_by_id = _load(profile_id)
+    ids = list(techs_by_id)
+    results = top_k_vectorized(ids, [techs_by_id[pk] for pk in ids], settings.RELATED_PROJECTS_COUNT)
+    return _store(results)
+
+
+def refresh(profile_id, project_id, previous=frozenset()):
+    """Recompute a project whose technologies changed, and the projects it affects"""
+    techs_by_id = _load(profile_id)
+    weights = idf_weights(list(techs_by_id.values()))
+    by_tech = {}
+    for pk, techs in techs_by_id.items():
+        for tech in techs:
+            by_tech.setdefault(tech, set()).add(pk)
+
+    # Anyone sharing a technology with the old or new set may gain or lose it
+    touched = techs_by_id.get(project_id, frozenset()) | previous
+    targets = {project_id}.union(*(by_tech.get(tech, ()) for tech in touched))
+    targets.update(RelatedProject.objects.filter(related_id=project_id).values_list('project_id', flat=True))
+
+    k = settings.RELATED_PROJECTS_COUNT
+    results = {}
+    for pk in targets & techs_by_id.keys():
+        candidates = set().union(*(by_tech[tech] for tech in techs_by_id[pk]))
+        results[pk] = top_k_for(pk, techs_by_id, weights, k, candidates)
+    return _store(results)
+
+
+def _project_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_loaded_technologies', None)
+    previous_profile_id = getattr(instance, '_loaded_profile_id', instance.profile_id)
+    moved = previous_profile_id != instance.profile_id
+    if not created and not moved and previous == instance.technologies:
+        return
+    instance._loaded_technologies = instance.technologies
+    instance._loaded_profile_id = instance.profile_id
+    profile_id, project_id = instance.profile_id, instance.pk
+    old_techs = technology_set(previous)
+
+    def run():
+        if moved:
+            # The old portfolio's projects may still list this one
+            refresh(previous_profile_id, project_id, old_techs)
+        refresh(profile_id, project_id, old_techs)
+
+    transaction.on_commit(run)
+
+
+def _project_deleted(sender, instance, **kwargs):
+    # Delete clears instance.pk afterwards, so capture it now
+    profile_id, project_id = instance.profile_id, instance.pk
+    previous = technology_set(instance.technologies)
+    transaction.on_commit(lambda: refresh(profile_id, project_id, previous))
+
+
+def connect_signals():
+    post_save.connect(_project_saved, sender=Project, dispatch_uid='related-projects-save')
+    post_delete.connect(_project_deleted, sender=Project, dispatch_uid='related-projects-delete')
@@ -0,0 +1,78 @@
+"""
+Markdown compilation and admin previews for ProjectContent blocks.
+
+Sources are compiled once when a block is saved (or by the
+recompile_markdown command) and the sanitized HTML is stored on the
+block, so requests only ever render stored HTML. The short plain-text
+preview shown in the admin changelist is stored the same way.
+"""
+
+import bleach
+import markdown
+from django.utils.html import strip_tags
+
+MARKDOWN_EXTENSIONS = ['extra', 'sane_lists', 'toc']
+MARKDOWN_EXTENSION_CONFIGS = {
+    'toc': {
+        'permalink': True,
+        'permalink_class': 'heading-anchor',
+        'toc_depth': '2-4',
+    },
+}
+
+ALLOWED_TAGS = [
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'dd', 'del', 'div', 'dl', 'dt',
+    'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p',
+    'pre', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead',
+    'tr', 'ul',
+]
+ALLOWED_ATTRIBUTES = {
+    '*': ['class', 'id', 'title'],
+    'a': ['href', 'title', 'class'],
+    'img': ['src', 'alt', 'title', 'width', 'height', 'loading'],
+    'td': ['align'],
+    'th': ['align'],
+}
+ALLOWED_PROTOCOLS = ['http', 'https', 'mailto']
+
+
+def _sanitize(html):
+    return bleach.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+        strip=True,
+    )
+
+
+def compile_markdown(source):
+    """Compile Markdown to sanitized ``(html, toc_html)``"""
+    if not source:
+        return '', ''
+    md = markdown.Markdown(
+        extensions=MARKDOWN_EXTENSIONS,
+        extension_configs=MARKDOWN_EXTENSION_CONFIGS,
+    )
+    html = md.convert(source)
+    toc = md.toc if getattr(md, 'toc_tokens', None) else ''
+    return _sanitize(html), _sanitize(toc)
+
+
+def _truncate(text, length):
+    return text[:length] + '...' if len(text) > length else text
+
+
+def block_preview(block):
+    """Short plain-text summary of a content block for the admin changelist"""
+    if block.content_type == 'text':
+        return _truncate(strip_tags(block.text_content or ''), 100)
+    if block.content_type == 'image':
+        return _truncate(block.image_caption or 'No image', 100)
+    if block.content_type == 'quote':
+        return f'"{_truncate(block.quote_text or "", 80)}"'
+    if block.content_type == 'code':
+        return block.code_language or 'Code'
+    if block.content_type == 'markdown':
+        return _truncate(block.markdown_source or '', 100)
+    return ''
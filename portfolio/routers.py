@@ -0,0 +1,60 @@
+"""
+Primary/replica database routing.
+
+Reads go to a replica only while ``ReplicaMiddleware`` has marked the
+current request as a replica-safe public page; everything else, including
+all writes, the admin, management commands and the background image and
+link-check jobs, uses ``default``. Only portfolio models are routed, so
+sessions and users are always read from the primary where they were
+written. The middleware picks one replica per request, so all of a
+page's queries see the same replica; the choice is a context variable, so
+it is per thread and per task. Migrations only ever run on the primary.
+
+To try it locally, point DATABASE_REPLICA_URLS at a copy of the migrated
+SQLite file.
+"""
+
+import contextvars
+import random
+
+from django.conf import settings
+
+PRIMARY = 'default'
+ROUTED_APPS = {'portfolio'}
+
+# Alias of the replica this context reads from, or None for the primary
+_read_replica = contextvars.ContextVar('read_replica', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+def use_replica():
+    """Send this context's portfolio reads to one random replica; returns a reset token"""
+    return _read_replica.set(random.choice(replica_aliases()))
+
+
+def use_primary(token):
+    _read_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Routes public-page reads to the request's replica and everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        replica = _read_replica.get()
+        if replica is not None and model._meta.app_label in ROUTED_APPS:
+            return replica
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary through replication
+        return db == PRIMARY
@@ -0,0 +1,71 @@
+"""
+Service worker generated at collectstatic time.
+
+After the static manifest is written, ServiceWorkerStaticFilesStorage
+renders ``templates/sw.js`` into STATIC_ROOT. The worker precaches the
+hashed site assets (SERVICE_WORKER_PRECACHE prefixes) in caches named
+after the manifest hash, so a deploy that changes any static file ships
+a new worker that drops the old caches. Pages are network-first with an
+offline fallback; images and CDN fonts are stale-while-revalidate. The
+``service_worker`` view serves it at /sw.js so its scope is the whole site.
+"""
+
+import json
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+SW_NAME = 'sw.js'
+
+_script = None
+
+
+def precache_urls(storage):
+    """URLs of the hashed assets to precache, from ``storage``'s manifest"""
+    prefixes = tuple(settings.SERVICE_WORKER_PRECACHE)
+    return [
+        # The plain storage URL: the manifest lookup in url() is skipped under DEBUG
+        FileSystemStorage.url(storage, hashed_name)
+        for name, hashed_name in sorted(storage.hashed_files.items())
+        if name.startswith(prefixes)
+    ]
+
+
+def render(storage):
+    network_only = [
+        reverse('admin:index'),
+        reverse('ckeditor_upload'),
+        reverse('ckeditor_browse'),
+        reverse('contact'),
+        reverse('metrics'),
+        reverse('service_worker'),
+    ]
+    return render_to_string(SW_NAME, {
+        'version': storage.manifest_hash,
+        'precache_urls': json.dumps(precache_urls(storage)),
+        'offline_url': reverse('offline'),
+        'network_only': json.dumps(network_only),
+    })
+
+
+def write(storage):
+    """Render the worker into ``storage`` next to the hashed files"""
+    if storage.exists(SW_NAME):
+        storage.delete(SW_NAME)
+    storage._save(SW_NAME, ContentFile(render(storage).encode()))
+
+
+def load():
+    """The generated worker, read once per process; None until collectstatic has run"""
+    global _script
+    if _script is None:
+        try:
+            with staticfiles_storage.open(SW_NAME) as file:
+                _script = file.read()
+        except FileNotFoundError:
+            return None
+    return _script
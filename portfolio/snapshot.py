@@ -0,0 +1,285 @@
+"""
+Read-only snapshot of the public site.
+
+``build_snapshot`` writes the public content of every portfolio to one
+file:
+
+    header   magic, format version, build time, index length
+    index    zlib-compressed JSON: column names per model, the profiles,
+             and the offset and length of every record
+    records  zlib-compressed JSON rows, one record per portfolio (skills,
+             projects, education, experience) and one per project
+             (content blocks, related project ids)
+
+With SNAPSHOT_MODE on, each worker mmaps the file. It only decodes a
+record the first time a page needs it. ``index``, ``projects`` and
+``project_detail`` then serve from memory without touching the database,
+so they keep working while it is down. Every SNAPSHOT_CHECK_INTERVAL
+seconds a worker stats the file and opens a new snapshot once the file
+has been replaced. ``build_snapshot`` replaces it by renaming a complete
+temporary file over it. Without a readable snapshot, the views fall back
+to the ORM.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import metrics
+from .models import Education, Experience, Profile, Project, ProjectContent, RelatedProject, Skill
+from .tenants import TenantMap
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PFSNAP'
+FORMAT_VERSION = 1
+# magic, format version, build time (unix seconds), index length
+HEADER = struct.Struct('>6sHdI')
+
+MODELS = {
+    'profile': Profile,
+    'skill': Skill,
+    'project': Project,
+    'block': ProjectContent,
+    'education': Education,
+    'experience': Experience,
+}
+
+# Pages render the compiled HTML, never the Markdown source
+OMITTED_COLUMNS = {'block': {'markdown_source'}}
+
+
+def _columns(key):
+    omitted = OMITTED_COLUMNS.get(key, set())
+    return [field.attname for field in MODELS[key]._meta.concrete_fields if field.attname not in omitted]
+
+
+def _encode(value):
+    return zlib.compress(json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':')).encode(), 9)
+
+
+def _decode(data):
+    return json.loads(zlib.decompress(data))
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def collect():
+    """Columns, profile rows and ``{key: record}`` for the whole site"""
+    columns = {key: _columns(key) for key in MODELS}
+
+    def rows(key, queryset):
+        return [list(row) for row in queryset.values_list(*columns[key])]
+
+    profiles = rows('profile', Profile.objects.order_by('pk'))
+    # Without any profile the site shows the rows that belong to none
+    profile_ids = [row[0] for row in profiles] or [None]
+
+    records = {}
+    project_ids = []
+    for profile_id in profile_ids:
+        projects = rows('project', Project.objects.filter(profile_id=profile_id))
+        project_ids += [row[0] for row in projects]
+        records[f'portfolio:{profile_id or 0}'] = {
+            'skills': rows('skill', Skill.objects.filter(profile_id=profile_id)),
+            'projects': projects,
+            'education': rows('education', Education.objects.filter(profile_id=profile_id)),
+            'experience': rows('experience', Experience.objects.filter(profile_id=profile_id)),
+        }
+
+    blocks = {}
+    project_column = columns['block'].index('project_id')
+    for row in rows('block', ProjectContent.objects.order_by('project_id', 'order', 'pk')):
+        blocks.setdefault(row[project_column], []).append(row)
+    related = {}
+    for project_id, related_id in RelatedProject.objects.order_by('project_id', 'rank').values_list(
+            'project_id', 'related_id'):
+        related.setdefault(project_id, []).append(related_id)
+    for project_id in project_ids:
+        records[f'project:{project_id}'] = {
+            'blocks': blocks.get(project_id, []),
+            'related': related.get(project_id, []),
+        }
+    return columns, profiles, records
+
+
+def build(path):
+    """Write a snapshot of the site to ``path``; returns ``(records, bytes)``"""
+    columns, profiles, records = collect()
+    body = bytearray()
+    offsets = {}
+    for key, record in records.items():
+        data = _encode(record)
+        offsets[key] = (len(body), len(data))
+        body += data
+    index = _encode({'columns': columns, 'profiles': profiles, 'records': offsets})
+
+    directory = os.path.dirname(os.path.abspath(path))
+    temporary = os.path.join(directory, f'.{os.path.basename(path)}.{os.getpid()}.tmp')
+    try:
+        with open(temporary, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, FORMAT_VERSION, time.time(), len(index)))
+            file.write(index)
+            file.write(body)
+            file.flush()
+            os.fsync(file.fileno())
+        # Readers see either the old file or the complete new one
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return len(records), HEADER.size + len(index) + len(body)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+class Portfolio:
+    """Decoded content of one portfolio"""
+
+    def __init__(self, skills, projects, education, experience):
+        self.skills = skills
+        self.projects = projects
+        self.education = education
+        self.experience = experience
+        self.by_slug = {project.slug: project for project in projects}
+        self.by_id = {project.pk: project for project in projects}
+
+    def featured_projects(self, count=3):
+        return [project for project in self.projects if project.is_featured][:count]
+
+
+class Snapshot:
+    """One mmapped snapshot file; records are decoded on first use and kept"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError(f'{path} is too short to be a snapshot')
+        magic, version, self.built_at, index_length = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a snapshot file')
+        if version != FORMAT_VERSION:
+            raise ValueError(f'{path} has snapshot format {version}, expected {FORMAT_VERSION}')
+
+        index = _decode(self.data[HEADER.size:HEADER.size + index_length])
+        self.base = HEADER.size + index_length
+        self.offsets = index['records']
+        self.columns = index['columns']
+        self.converters = {
+            key: [MODELS[key]._meta.get_field(name).to_python for name in names]
+            for key, names in self.columns.items()
+        }
+        self.records = {}
+        self.lock = threading.Lock()
+
+        profiles = self.instances('profile', index['profiles'])
+        self.tenants = TenantMap()
+        self.tenants.fill(profiles, float('inf'))
+
+    def instances(self, key, rows):
+        """Model instances built from snapshot rows, without queries"""
+        model, names, converters = MODELS[key], self.columns[key], self.converters[key]
+        return [
+            model.from_db(None, names, [convert(value) for convert, value in zip(converters, row)])
+            for row in rows
+        ]
+
+    def _record(self, key, build):
+        record = self.records.get(key)
+        metrics.record_cache_lookup('snapshot', record is not None)
+        if record is None:
+            if key not in self.offsets:
+                return None
+            offset, length = self.offsets[key]
+            start = self.base + offset
+            record = build(_decode(self.data[start:start + length]))
+            with self.lock:
+                record = self.records.setdefault(key, record)
+        return record
+
+    def portfolio(self, tenant):
+        """Content of ``tenant``'s portfolio (an empty one if it isn't in the snapshot)"""
+        portfolio = self._record(f'portfolio:{tenant.pk if tenant is not None else 0}', lambda data: Portfolio(
+            self.instances('skill', data['skills']),
+            self.instances('project', data['projects']),
+            self.instances('education', data['education']),
+            self.instances('experience', data['experience']),
+        ))
+        return portfolio or Portfolio([], [], [], [])
+
+    def project_page(self, tenant, slug):
+        """``(project, content_blocks, related_projects)``, or None for an unknown slug"""
+        portfolio = self.portfolio(tenant)
+        project = portfolio.by_slug.get(slug)
+        if project is None:
+            return None
+        page = self._record(f'project:{project.pk}', lambda data: (
+            self.instances('block', data['blocks']),
+            [portfolio.by_id[pk] for pk in data['related'] if pk in portfolio.by_id],
+        ))
+        blocks, related = page or ([], [])
+        return project, blocks, related
+
+
+class SnapshotStore:
+    """This process's current snapshot, reopened when the file is replaced"""
+
+    def __init__(self):
+        self.snapshot = None
+        self.signature = None
+        self.next_check = 0.0
+        self.lock = threading.Lock()
+
+    def current(self):
+        """The snapshot to serve from, or None to use the database"""
+        if not settings.SNAPSHOT_MODE:
+            return None
+        if time.monotonic() >= self.next_check and self.lock.acquire(blocking=self.snapshot is None):
+            # One thread checks the file; the others keep serving the current snapshot
+            try:
+                if time.monotonic() >= self.next_check:
+                    self.next_check = time.monotonic() + settings.SNAPSHOT_CHECK_INTERVAL
+                    self._check()
+            finally:
+                self.lock.release()
+        return self.snapshot
+
+    def _check(self):
+        path = settings.SNAPSHOT_PATH
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if self.signature is not None:
+                logger.warning('Snapshot %s is gone; still serving the one already loaded', path)
+                self.signature = None
+            return
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self.signature:
+            return
+        # Remember bad files too, so a broken snapshot isn't re-read on every check
+        self.signature = signature
+        try:
+            snapshot = Snapshot(path)
+        except (OSError, ValueError, KeyError, zlib.error):
+            logger.exception('Could not load snapshot %s', path)
+            return
+        # The old mapping is released once the last request using it finishes
+        self.snapshot = snapshot
+        logger.info('Serving snapshot %s built at %s', path, time.ctime(snapshot.built_at))
+
+
+snapshot_store = SnapshotStore()
@@ -1,4 +1,7 @@
 from cloudinary_storage.storage import RawMediaCloudinaryStorage
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from . import serviceworker
 
 class PublicMediaStorage(RawMediaCloudinaryStorage):
     """Custom Cloudinary storage that forces public access for all uploads"""
@@ -21,3 +24,14 @@ class PublicMediaStorage(RawMediaCloudinaryStorage):
             'access_mode': 'public',
         })
         return options
+
+
+class ServiceWorkerStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """WhiteNoise storage that also generates the service worker from the manifest"""
+    
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        if not kwargs.get('dry_run'):
+            # The manifest (and its hash) has been saved by now
+            serviceworker.write(self)
+            yield serviceworker.SW_NAME, serviceworker.SW_NAME, True
@@ -0,0 +1,95 @@
+"""
+Host-based routing of requests to portfolios.
+
+Each Profile is a tenant, served on its ``domain``; any other allowed host
+gets the default portfolio (the one without a domain, else the oldest).
+Every process keeps a plain ``{host: Profile}`` dict, so resolving a
+request is a clock check and a single dictionary lookup. The dict is rebuilt after
+``TENANT_CACHE_TTL`` seconds, and immediately in the process where a
+Profile is saved or deleted; other workers pick the change up within the
+TTL.
+"""
+
+import threading
+import time
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import metrics
+from .models import Profile
+
+# Hosts seen on misses are memoized too; ALLOWED_HOSTS bounds them, this caps them
+MAX_MEMOIZED_HOSTS = 1000
+
+
+class TenantMap:
+    """Per-process host -> Profile map with a TTL"""
+
+    def __init__(self):
+        self.hosts = {}
+        self.default = None
+        self.expires = 0.0
+        self.loading = threading.Lock()
+
+    def load(self, ttl):
+        """Rebuild the map from the database"""
+        self.fill(list(Profile.objects.order_by('pk')), ttl)
+
+    def fill(self, profiles, ttl):
+        """Map the hosts of ``profiles`` (in pk order) for ``ttl`` seconds"""
+        self.default = next((p for p in profiles if not p.domain), profiles[0] if profiles else None)
+        self.hosts = {p.domain: p for p in profiles if p.domain}
+        self.expires = time.monotonic() + ttl
+
+    def invalidate(self):
+        self.expires = 0.0
+
+    def resolve(self, host, ttl):
+        """Profile serving ``host``, or the default portfolio"""
+        if time.monotonic() >= self.expires and self.loading.acquire(blocking=not self.hosts):
+            # One thread reloads; the others keep serving from the current map
+            try:
+                self.load(ttl)
+            finally:
+                self.loading.release()
+        tenant = self.hosts.get(host)
+        metrics.record_cache_lookup('tenants', tenant is not None)
+        if tenant is None:
+            tenant = self._miss(host)
+        return tenant
+
+    def _miss(self, host):
+        domain = host.rsplit(':', 1)[0] if host.count(':') == 1 else host
+        tenant = self.hosts.get(domain.lower(), self.default)
+        if tenant is not None and len(self.hosts) < MAX_MEMOIZED_HOSTS:
+            # Remember the raw Host header so the next request is one lookup
+            self.hosts[host] = tenant
+        return tenant
+
+
+tenant_map = TenantMap()
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_tenants(sender, **kwargs):
+    tenant_map.invalidate()
+
+
+def get_tenant(domain=None):
+    """Profile served on ``domain``, or the default portfolio; for code outside requests"""
+    if domain:
+        return Profile.objects.filter(domain=domain.strip().lower()).first()
+    profiles = Profile.objects.order_by('pk')
+    return profiles.filter(domain__isnull=True).first() or profiles.first()
+
+
+def for_tenant(queryset, tenant):
+    """Restrict ``queryset`` to rows belonging to ``tenant``"""
+    return queryset.filter(profile=tenant)
+
+
+def tenant_cache_key(tenant, key):
+    """Namespace a cache key to one portfolio"""
+    return f"t{tenant.pk if tenant is not None else 0}:{key}"
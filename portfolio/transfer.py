@@ -0,0 +1,373 @@
+"""
+Streaming export/import of portfolio content.
+
+Records are plain dicts of the form ``{"type": ..., "fields": {...}}``;
+projects also carry their ``content_blocks``. They can be written as JSON
+Lines (one record per line) or as a directory holding ``site.jsonl`` plus
+one Markdown file per project. Both readers and writers work one record at
+a time, and imports are flushed in batches with bulk upserts so memory
+stays bounded by the batch size. An export covers one portfolio, and an
+import attaches everything it reads to the profile it imports.
+"""
+
+import datetime
+import json
+from pathlib import Path
+
+from django.db import models, transaction
+from django.utils.text import slugify
+
+from .models import Education, Experience, Profile, Project, ProjectContent, Skill
+from .purge import profile_key, purge_keys
+from .tenants import get_tenant
+
+DEFAULT_BATCH_SIZE = 500
+
+# Record type -> model for the flat (non-project) records
+SITE_MODELS = {
+    'profile': Profile,
+    'skill': Skill,
+    'education': Education,
+    'experience': Experience,
+}
+
+# Natural keys used to upsert records that have no unique column
+NATURAL_KEYS = {
+    Skill: ('name',),
+    Education: ('degree', 'institution', 'start_date'),
+    Experience: ('title', 'company', 'start_date'),
+}
+
+# Field holding the Markdown body of each content block type
+BLOCK_BODY_FIELDS = {
+    'text': 'text_content',
+    'quote': 'quote_text',
+    'code': 'code_content',
+    'markdown': 'markdown_source',
+}
+
+# Fields derived on save; left out of Markdown exports and rebuilt on import
+DERIVED_BLOCK_FIELDS = ('markdown_html', 'markdown_toc', 'preview')
+
+BLOCK_MARKER = '<!-- block '
+
+
+def _data_fields(model):
+    """Concrete, non-relational, non-pk fields of a model"""
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and not field.is_relation
+    ]
+
+
+def serialize(instance):
+    """Turn a model instance into a JSON-friendly dict of its data fields"""
+    data = {}
+    for field in _data_fields(type(instance)):
+        value = getattr(instance, field.attname)
+        if isinstance(field, models.FileField):
+            value = value.name if value else ''
+        elif isinstance(value, (datetime.date, datetime.datetime)):
+            value = value.isoformat()
+        data[field.name] = value
+    return data
+
+
+def build(model, data):
+    """Build an unsaved instance from a dict produced by ``serialize``"""
+    fields = {field.name: field for field in _data_fields(model)}
+    values = {}
+    for name, value in data.items():
+        field = fields.get(name)
+        if field is None:
+            continue
+        if value is not None and isinstance(field, (models.DateField, models.DateTimeField)):
+            value = field.to_python(value)
+        values[field.attname] = value
+    return model(**values)
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def iter_records(profile, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield every record of one portfolio, projects last, without loading whole tables"""
+    for record_type, model in SITE_MODELS.items():
+        rows = model.objects.filter(pk=profile.pk) if model is Profile else model.objects.filter(profile=profile)
+        for instance in rows.order_by('pk').iterator(chunk_size=batch_size):
+            yield {'type': record_type, 'fields': serialize(instance)}
+
+    projects = Project.objects.filter(profile=profile).order_by('pk').prefetch_related('content_blocks')
+    for project in projects.iterator(chunk_size=batch_size):
+        yield {
+            'type': 'project',
+            'fields': serialize(project),
+            'content_blocks': [serialize(block) for block in project.content_blocks.all()],
+        }
+
+
+def write_jsonl(records, stream):
+    count = 0
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False))
+        stream.write('\n')
+        count += 1
+    return count
+
+
+def _project_markdown(record):
+    lines = ['---', json.dumps(record['fields'], ensure_ascii=False, indent=2), '---', '']
+    for block in record['content_blocks']:
+        meta = {k: v for k, v in block.items() if k not in DERIVED_BLOCK_FIELDS}
+        body_field = BLOCK_BODY_FIELDS.get(meta.get('content_type'))
+        body = meta.pop(body_field, '') if body_field else ''
+        lines.append(f'{BLOCK_MARKER}{json.dumps(meta, ensure_ascii=False)} -->')
+        lines.append(body or '')
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def write_markdown(records, directory):
+    """Write site records to ``site.jsonl`` and each project to ``projects/<slug>.md``"""
+    directory = Path(directory)
+    project_dir = directory / 'projects'
+    project_dir.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with open(directory / 'site.jsonl', 'w', encoding='utf-8') as site:
+        for record in records:
+            if record['type'] == 'project':
+                path = project_dir / f"{record['fields']['slug']}.md"
+                path.write_text(_project_markdown(record), encoding='utf-8')
+            else:
+                site.write(json.dumps(record, ensure_ascii=False))
+                site.write('\n')
+            count += 1
+    return count
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+def read_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _parse_project_markdown(text):
+    lines = text.split('\n')
+    if not lines or lines[0] != '---':
+        raise ValueError('Project file must start with a --- front matter block')
+    end = lines.index('---', 1)
+    record = {
+        'type': 'project',
+        'fields': json.loads('\n'.join(lines[1:end])),
+        'content_blocks': [],
+    }
+
+    block, body = None, []
+
+    def finish():
+        body_field = BLOCK_BODY_FIELDS.get(block.get('content_type'))
+        if body_field:
+            block[body_field] = '\n'.join(body).strip('\n')
+        record['content_blocks'].append(block)
+
+    for line in lines[end + 1:]:
+        if line.startswith(BLOCK_MARKER) and line.endswith('-->'):
+            if block is not None:
+                finish()
+            block, body = json.loads(line[len(BLOCK_MARKER):-3]), []
+        elif block is not None:
+            body.append(line)
+    if block is not None:
+        finish()
+    return record
+
+
+def read_markdown(directory):
+    directory = Path(directory)
+    site = directory / 'site.jsonl'
+    if site.exists():
+        with open(site, encoding='utf-8') as stream:
+            yield from read_jsonl(stream)
+    for path in sorted((directory / 'projects').glob('*.md')):
+        yield _parse_project_markdown(path.read_text(encoding='utf-8'))
+
+
+class Importer:
+    """
+    Buffers incoming records per type and flushes them with bulk upserts.
+
+    Projects are upserted on ``(profile, slug)``; their content blocks are
+    matched by position and updated in place, so files referenced by
+    existing blocks are never queued for deletion. Skills, education and
+    experience are upserted on the natural keys in ``NATURAL_KEYS`` within
+    the portfolio. Rows go to the imported profile, or to ``profile`` when
+    the input has none.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, progress=None, profile=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.profile = profile
+        self.buffers = {}
+        self.counts = {}
+
+    def feed(self, records):
+        for record in records:
+            record_type = record.get('type')
+            if record_type != 'project' and record_type not in SITE_MODELS:
+                raise ValueError(f'Unknown record type: {record_type!r}')
+            buffer = self.buffers.setdefault(record_type, [])
+            buffer.append(record)
+            if len(buffer) >= self.batch_size:
+                self.flush(record_type)
+        for record_type in list(self.buffers):
+            self.flush(record_type)
+        return self.counts
+
+    def flush(self, record_type):
+        records = self.buffers.pop(record_type, [])
+        if not records:
+            return
+        with transaction.atomic():
+            if record_type == 'project':
+                self._import_projects(records)
+            elif record_type == 'profile':
+                self._import_profile(records)
+            else:
+                self._import_keyed(SITE_MODELS[record_type], records)
+            # Bulk writes send no post_save; everything on this portfolio may have changed
+            purge_keys([profile_key(self.profile.pk)] if self.profile else [])
+        self.counts[record_type] = self.counts.get(record_type, 0) + len(records)
+        if self.progress:
+            self.progress(record_type, self.counts[record_type])
+
+    def _profile_id(self):
+        if self.profile is None:
+            self.profile = get_tenant()
+            if self.profile is None:
+                raise ValueError('No profile to import into; include a profile record')
+        return self.profile.pk
+
+    def _import_profile(self, records):
+        incoming = build(Profile, records[-1]['fields'])
+        existing = get_tenant(incoming.domain)
+        if existing:
+            incoming.pk = existing.pk
+        incoming.save()
+        self.profile = incoming
+
+    def _import_keyed(self, model, records):
+        key_fields = NATURAL_KEYS[model]
+        profile_id = self._profile_id()
+
+        def key(obj):
+            return tuple(getattr(obj, name) for name in key_fields)
+
+        # A key repeated within the batch keeps its last record
+        latest = {}
+        for record in records:
+            obj = build(model, record['fields'])
+            obj.profile_id = profile_id
+            latest[key(obj)] = obj
+        instances = list(latest.values())
+
+        first = key_fields[0]
+        candidates = model.objects.filter(
+            profile_id=profile_id,
+            **{f'{first}__in': {getattr(obj, first) for obj in instances}},
+        )
+        existing = {key(obj): obj.pk for obj in candidates}
+
+        to_create, to_update = [], []
+        for obj in instances:
+            pk = existing.get(key(obj))
+            if pk is None:
+                to_create.append(obj)
+            else:
+                obj.pk = pk
+                to_update.append(obj)
+
+        model.objects.bulk_create(to_create, batch_size=self.batch_size)
+        update_fields = [f.name for f in _data_fields(model) if f.name not in key_fields]
+        if to_update and update_fields:
+            model.objects.bulk_update(to_update, update_fields, batch_size=self.batch_size)
+
+    def _import_projects(self, records):
+        profile_id = self._profile_id()
+        # One upsert can't touch a row twice; a repeated slug keeps its last record
+        latest = {}
+        for record in records:
+            project = build(Project, record['fields'])
+            project.slug = project.slug or slugify(project.title)
+            project.profile_id = profile_id
+            latest[project.slug] = (project, record)
+        projects = [project for project, _ in latest.values()]
+        records = [record for _, record in latest.values()]
+        timestamps = [
+            f.name for f in _data_fields(Project)
+            if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+        ]
+        original_times = [
+            {name: getattr(project, name) for name in timestamps} for project in projects
+        ]
+
+        Project.objects.bulk_create(
+            projects,
+            update_conflicts=True,
+            unique_fields=['profile', 'slug'],
+            update_fields=[f.name for f in _data_fields(Project) if f.name != 'slug'],
+        )
+
+        # Not every backend returns ids for upserted rows, so look them up
+        ids = dict(
+            Project.objects.filter(profile_id=profile_id, slug__in=[p.slug for p in projects])
+            .values_list('slug', 'pk')
+        )
+        restored = []
+        for project, times in zip(projects, original_times):
+            project.pk = ids[project.slug]
+            if all(times.values()):
+                for name, value in times.items():
+                    setattr(project, name, value)
+                restored.append(project)
+        if restored and timestamps:
+            # auto_now/auto_now_add overwrite timestamps on insert; put the originals back
+            Project.objects.bulk_update(restored, timestamps, batch_size=self.batch_size)
+
+        self._import_blocks(projects, records)
+
+    def _import_blocks(self, projects, records):
+        existing = {}
+        rows = ProjectContent.objects.filter(project__in=projects).order_by('project_id', 'order', 'pk')
+        for project_id, pk in rows.values_list('project_id', 'pk'):
+            existing.setdefault(project_id, []).append(pk)
+
+        to_create, to_update, to_delete = [], [], []
+        for project, record in zip(projects, records):
+            current = existing.get(project.pk, [])
+            incoming = record.get('content_blocks', [])
+            for index, data in enumerate(incoming):
+                block = build(ProjectContent, data)
+                block.project_id = project.pk
+                block.render_markdown()
+                block.render_preview()
+                if index < len(current):
+                    block.pk = current[index]
+                    to_update.append(block)
+                else:
+                    to_create.append(block)
+            to_delete.extend(current[len(incoming):])
+
+        fields = [f.name for f in _data_fields(ProjectContent)]
+        if to_update:
+            ProjectContent.objects.bulk_update(to_update, fields, batch_size=self.batch_size)
+        ProjectContent.objects.bulk_create(to_create, batch_size=self.batch_size)
+        if to_delete:
+            ProjectContent.objects.filter(pk__in=to_delete).delete()
+        self.counts['content_block'] = self.counts.get('content_block', 0) + len(to_create) + len(to_update)
@@ -5,4 +5,9 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('projects/', views.projects, name='projects'),
     path('project/<slug:slug>/', views.project_detail, name='project_detail'),
+    path('project/<slug:slug>/blocks/', views.project_blocks, name='project_blocks'),
+    path('contact/', views.contact, name='contact'),
+    path('offline/', views.offline, name='offline'),
+    path('sw.js', views.service_worker, name='service_worker'),
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,16 +1,112 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib import messages
-from .models import Profile, Skill, Project, Education, Experience, ContactMessage
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import has_vary_header, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_http_methods, require_safe
+from .models import Profile, Skill, Project, ProjectContent, RelatedProject, Education, Experience, ContactMessage
 from .forms import ContactForm
+from .purge import page_keys, project_key, set_surrogate_keys
+from .ratelimit import check_contact_rate
+from .snapshot import snapshot_store
+from .tenants import for_tenant
+from . import metrics as metrics_registry
+from . import serviceworker
+
+# Columns each content block type needs to render
+BLOCK_BASE_FIELDS = ('id', 'project_id', 'content_type', 'order')
+BLOCK_FIELDS = {
+    'text': ('text_content',),
+    'image': ('image', 'image_caption'),
+    'quote': ('quote_text', 'quote_author'),
+    'code': ('code_content', 'code_language'),
+    'markdown': ('markdown_html', 'markdown_toc'),
+}
+
+STREAM_MARKER = '<!--content-blocks-->'
+
+
+def load_content_blocks(project, offset=0, limit=None):
+    """
+    Load a slice of a project's content blocks in display order.
+
+    Each block type is fetched with .only() for the columns it renders, so
+    large columns of other types (and Markdown sources) never leave the DB.
+    """
+    # pk breaks ties between equal orders so consecutive slices never overlap or skip
+    index = project.content_blocks.order_by('order', 'pk').values_list('pk', 'content_type')
+    index = list(index[offset:offset + limit] if limit is not None else index[offset:])
+
+    pks_by_type = {}
+    for pk, content_type in index:
+        pks_by_type.setdefault(content_type, []).append(pk)
+
+    loaded = {}
+    for content_type, pks in pks_by_type.items():
+        fields = BLOCK_BASE_FIELDS + BLOCK_FIELDS.get(content_type, ())
+        for block in ProjectContent.objects.filter(pk__in=pks).only(*fields):
+            loaded[block.pk] = block
+    return [loaded[pk] for pk, _ in index if pk in loaded]
+
+
+def shared_cache(view):
+    """
+    Mark a public page cacheable by shared caches (CDNs, proxies).
+
+    Browsers revalidate (max-age=0) while shared caches may keep the page
+    for PUBLIC_CACHE_SECONDS. Responses that ended up varying on Cookie,
+    e.g. for a staff profiling request, are left uncached.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        seconds = settings.PUBLIC_CACHE_SECONDS
+        if seconds and response.status_code == 200 and not has_vary_header(response, 'Cookie'):
+            patch_cache_control(response, public=True, max_age=0, s_maxage=seconds)
+        return response
+    return wrapper
+
 
+def load_related_projects(project):
+    """Precomputed related projects, with the card fields, in one query"""
+    entries = (
+        # Rows of a project that just moved between portfolios may not be refreshed yet
+        RelatedProject.objects.filter(project=project, related__profile_id=project.profile_id)
+        .select_related('related')
+        .only('rank', 'related__title', 'related__slug', 'related__short_description',
+              'related__featured_image', 'related__technologies')
+        .order_by('rank')
+    )
+    return [entry.related for entry in entries]
 
+
+def _next_blocks_url(project, offset):
+    return f"{reverse('project_blocks', args=[project.slug])}?offset={offset}"
+
+
+@require_safe
+@shared_cache
 def index(request):
     """Homepage view"""
-    profile = Profile.objects.first()
-    skills = Skill.objects.all()
-    featured_projects = Project.objects.filter(is_featured=True)[:3]
-    education = Education.objects.all()
-    experience = Experience.objects.all()
+    profile = request.tenant
+    snapshot = snapshot_store.current()
+    if snapshot is not None:
+        portfolio = snapshot.portfolio(profile)
+        skills = portfolio.skills
+        featured_projects = portfolio.featured_projects()
+        education = portfolio.education
+        experience = portfolio.experience
+    else:
+        skills = for_tenant(Skill.objects.all(), profile)
+        featured_projects = for_tenant(Project.objects.filter(is_featured=True), profile)[:3]
+        education = for_tenant(Education.objects.all(), profile)
+        experience = for_tenant(Experience.objects.all(), profile)
     
     # Group skills by category
     skills_by_category = {}
@@ -19,44 +115,165 @@ def index(request):
             skills_by_category[skill.category] = []
         skills_by_category[skill.category].append(skill)
     
-    # Handle contact form
-    if request.method == 'POST':
-        form = ContactForm(request.POST)
-        if form.is_valid():
-            form.save()
-            messages.success(request, 'Thank you for your message! I will get back to you soon.')
-            return redirect('index')
-    else:
-        form = ContactForm()
-    
+    # The form posts to the contact endpoint, so this page carries no CSRF token
     context = {
         'profile': profile,
         'skills_by_category': skills_by_category,
         'featured_projects': featured_projects,
         'education': education,
         'experience': experience,
-        'form': form,
+        'form': ContactForm(),
     }
-    return render(request, 'index.html', context)
+    response = render(request, 'index.html', context)
+    return set_surrogate_keys(response, page_keys('index', profile))
 
 
+@never_cache
+@require_http_methods(['GET', 'POST'])
+def contact(request):
+    """
+    JSON endpoint for the contact form.
+
+    GET hands out a CSRF token (setting the CSRF cookie only here, never on
+    the public pages); POST validates and saves the message.
+    """
+    if request.method == 'GET':
+        return JsonResponse({'csrfToken': get_token(request)})
+    
+    limited = check_contact_rate(request)
+    if limited is not None:
+        return limited
+    form = ContactForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'ok': False, 'errors': form.errors.get_json_data()}, status=400)
+    message = form.save(commit=False)
+    message.profile = request.tenant
+    message.save()
+    return JsonResponse({'ok': True, 'message': 'Thank you for your message! I will get back to you soon.'})
+
+
+@shared_cache
 def projects(request):
     """Projects listing view"""
-    all_projects = Project.objects.all()
+    snapshot = snapshot_store.current()
+    if snapshot is not None:
+        all_projects = snapshot.portfolio(request.tenant).projects
+    else:
+        all_projects = for_tenant(Project.objects.all(), request.tenant)
     
     context = {
         'projects': all_projects,
     }
-    return render(request, 'projects.html', context)
+    response = render(request, 'projects.html', context)
+    return set_surrogate_keys(response, page_keys('projects', request.tenant))
 
 
+@shared_cache
 def project_detail(request, slug):
     """Individual project detail view"""
-    project = get_object_or_404(Project, slug=slug)
-    content_blocks = project.content_blocks.all()
-    
-    context = {
+    snapshot = snapshot_store.current()
+    if snapshot is not None:
+        # Every block is already in memory, so there is nothing to gain from streaming
+        project, content_blocks, related_projects = _snapshot_project(snapshot, request, slug)
+    else:
+        project = get_object_or_404(for_tenant(Project.objects.all(), request.tenant), slug=slug)
+        related_projects = load_related_projects(project)
+        content_blocks = None if settings.PROJECT_STREAMING else load_content_blocks(project)
+    if content_blocks is None:
+        response = _stream_project_detail(request, project, related_projects)
+    else:
+        context = {
+            'project': project,
+            'content_blocks': content_blocks,
+            'related_projects': related_projects,
+        }
+        response = render(request, 'project_detail.html', context)
+    # The related cards show other projects' titles and images too
+    keys = page_keys('project', request.tenant, project) + [project_key(related.pk) for related in related_projects]
+    return set_surrogate_keys(response, keys)
+
+
+def _snapshot_project(snapshot, request, slug):
+    page = snapshot.project_page(request.tenant, slug)
+    if page is None:
+        raise Http404('No project matches the given query.')
+    return page
+
+
+def _stream_project_detail(request, project, related_projects):
+    """Flush the page header and first blocks before the rest of the write-up is loaded"""
+    initial = settings.PROJECT_STREAM_INITIAL_BLOCKS
+    page = render_to_string('project_detail.html', {
         'project': project,
-        'content_blocks': content_blocks,
-    }
-    return render(request, 'project_detail.html', context)
\ No newline at end of file
+        'stream_marker': STREAM_MARKER,
+        'related_projects': related_projects,
+    }, request)
+    head, tail = page.split(STREAM_MARKER, 1)
+    
+    def stream():
+        yield head
+        # Fetch one extra block to learn whether a sentinel is needed without a COUNT
+        blocks = load_content_blocks(project, 0, initial + 1)
+        yield render_to_string('partials/content_blocks.html', {
+            'content_blocks': blocks[:initial],
+            'next_blocks_url': _next_blocks_url(project, initial) if len(blocks) > initial else None,
+        }, request)
+        yield tail
+    
+    return StreamingHttpResponse(stream(), content_type='text/html; charset=utf-8')
+
+
+@shared_cache
+def project_blocks(request, slug):
+    """HTML fragment with the next chunk of a project's content blocks"""
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        offset = 0
+    chunk = settings.PROJECT_BLOCKS_CHUNK_SIZE
+    
+    snapshot = snapshot_store.current()
+    if snapshot is not None:
+        project, all_blocks, _ = _snapshot_project(snapshot, request, slug)
+        blocks = all_blocks[offset:offset + chunk + 1]
+    else:
+        project = get_object_or_404(for_tenant(Project.objects.only('id', 'slug'), request.tenant), slug=slug)
+        blocks = load_content_blocks(project, offset, chunk + 1)
+    html = render_to_string('partials/content_blocks.html', {
+        'content_blocks': blocks[:chunk],
+        'next_blocks_url': _next_blocks_url(project, offset + chunk) if len(blocks) > chunk else None,
+    }, request)
+    return set_surrogate_keys(HttpResponse(html), page_keys('project', request.tenant, project))
+
+
+@require_safe
+@shared_cache
+def offline(request):
+    """Fallback page the service worker shows when a page can't be fetched"""
+    response = render(request, 'offline.html')
+    return set_surrogate_keys(response, page_keys('offline', request.tenant))
+
+
+@require_safe
+def service_worker(request):
+    """Service worker generated by collectstatic, served from the root so it controls every page"""
+    script = serviceworker.load()
+    if script is None:
+        raise Http404
+    response = HttpResponse(script, content_type='application/javascript; charset=utf-8')
+    # Browsers compare the script on every update check; never let a cache serve an old one
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@never_cache
+def metrics(request):
+    """Prometheus scrape endpoint, for a bearer token or logged-in staff"""
+    token = settings.METRICS_TOKEN
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    token_ok = bool(token) and constant_time_compare(auth, f'Bearer {token}')
+    if not token_ok and not request.user.is_staff:
+        raise Http404
+    
+    body = metrics_registry.render_prometheus(metrics_registry.collect())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
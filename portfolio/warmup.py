@@ -0,0 +1,58 @@
+"""
+Warmup steps run by gunicorn.conf.py before workers take traffic.
+
+``warm_shared`` runs once in the gunicorn master after the preloaded app
+is imported. Whatever it builds (compiled templates in the cached loader,
+the URL resolver, the staticfiles manifest) is inherited copy-on-write by
+every forked worker. ``close_connections`` then runs on both sides of
+the fork. Database connections are not opened ahead of time: Django's are
+per thread, and gthread workers serve requests on threads other than the
+one running gunicorn's hooks, so each request thread opens its own.
+"""
+
+import logging
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver, reverse
+
+from .snapshot import snapshot_store
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TEMPLATES = [
+    'base.html',
+    'index.html',
+    'projects.html',
+    'project_detail.html',
+    'partials/content_block.html',
+    'partials/content_blocks.html',
+]
+
+WARMUP_URLS = ['index', 'projects']
+
+
+def warm_shared():
+    """Pre-compile templates and build process-wide lookups before forking"""
+    for name in WARMUP_TEMPLATES:
+        get_template(name)
+
+    get_resolver()._populate()
+    for name in WARMUP_URLS:
+        reverse(name)
+
+    try:
+        # Loads and parses staticfiles.json once for all workers
+        staticfiles_storage.url('css/style.css')
+    except ValueError:
+        logger.warning('Static manifest missing; run collectstatic before starting gunicorn')
+
+    # Workers inherit the mapping; its pages sit once in the OS page cache
+    snapshot_store.current()
+
+
+def close_connections():
+    """Drop DB connections inherited from the master; sockets can't be shared across forks"""
+    for conn in connections.all():
+        conn.close()
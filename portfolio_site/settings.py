@@ -44,17 +44,21 @@ INSTALLED_APPS = [
     'portfolio',
     'ckeditor',
     'ckeditor_uploader',
-    'django_cleanup.apps.CleanupConfig',
 ]
 
 MIDDLEWARE = [
+    'portfolio.middleware.MetricsMiddleware',  # First, so latency covers the whole stack
+    'portfolio.middleware.CompressionMiddleware',  # Before anything else that touches the body
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add whitenoise for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'portfolio.middleware.TenantMiddleware',  # After CommonMiddleware: relies on its host validation
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'portfolio.middleware.ProfilerMiddleware',  # After auth: profiling is staff-only
+    'portfolio.middleware.ReplicaMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -71,6 +75,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'portfolio.context_processors.tenant',
                 'django.template.context_processors.media',
             ],
         },
@@ -93,6 +98,42 @@ DATABASES = {
     )
 }
 
+# Read replicas, as comma-separated DATABASE_URL-style URLs. Public pages
+# (REPLICA_VIEWS) read from one random replica per request; writes, the
+# admin, sessions and a client's reads for REPLICA_PIN_SECONDS after it
+# writes use the primary. Migrations run on the primary only. See
+# portfolio/routers.py.
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+for index, url in enumerate(DATABASE_REPLICA_URLS):
+    DATABASES[f'replica_{index}'] = dj_database_url.parse(url, conn_max_age=600)
+    DATABASES[f'replica_{index}']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['portfolio.routers.ReplicaRouter']
+REPLICA_VIEWS = ['index', 'projects', 'project_detail', 'project_blocks']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+
+
+# Cache
+# Rate limiting relies on atomic cache increments shared by all gunicorn
+# workers, so production should point REDIS_URL at a Redis instance. The
+# local-memory fallback is per-process and only suitable for development.
+
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -134,8 +175,11 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
-# Whitenoise configuration for production static file serving
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Whitenoise configuration for production static file serving; collectstatic
+# also writes the service worker (see portfolio/serviceworker.py), which
+# precaches the hashed files under these prefixes
+STATICFILES_STORAGE = 'portfolio.storage.ServiceWorkerStaticFilesStorage'
+SERVICE_WORKER_PRECACHE = config('SERVICE_WORKER_PRECACHE', default='css/,js/,fonts/,images/', cast=Csv())
 
 # Cloudinary configuration for media files (images, CV, etc.)
 import cloudinary
@@ -180,7 +224,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CKEditor Settings
 CKEDITOR_UPLOAD_PATH = 'uploads/'
-CKEDITOR_IMAGE_BACKEND = "pillow"
+# Saves uploads as-is and queues a resized, metadata-free copy in the background
+CKEDITOR_IMAGE_BACKEND = "portfolio.images.OptimizingPillowBackend"
 CKEDITOR_JQUERY_URL = 'https://ajax.googleapis.com/ajax/libs/jquery/2.2.4/jquery.min.js'
 
 CKEDITOR_CONFIGS = {
@@ -204,6 +249,116 @@ CKEDITOR_CONFIGS = {
 }
 
 
+# Upload optimization (see portfolio/images.py)
+IMAGE_OPTIMIZE_WORKERS = config('IMAGE_OPTIMIZE_WORKERS', default=2, cast=int)
+IMAGE_MAX_WIDTH = config('IMAGE_MAX_WIDTH', default=1600, cast=int)
+IMAGE_QUALITY = config('IMAGE_QUALITY', default=82, cast=int)
+
+
+# Project detail rendering
+# When streaming is on, project_detail flushes the header and the first
+# blocks immediately and the page fetches the rest in chunks on scroll.
+PROJECT_STREAMING = config('PROJECT_STREAMING', default=False, cast=bool)
+PROJECT_STREAM_INITIAL_BLOCKS = config('PROJECT_STREAM_INITIAL_BLOCKS', default=3, cast=int)
+PROJECT_BLOCKS_CHUNK_SIZE = config('PROJECT_BLOCKS_CHUNK_SIZE', default=5, cast=int)
+# How many related projects are precomputed and shown (see portfolio/related.py)
+RELATED_PROJECTS_COUNT = config('RELATED_PROJECTS_COUNT', default=3, cast=int)
+
+
+# Contact form rate limits, as "<count>/<seconds>"
+# The global limit sheds load with a 429 before any validation or DB work.
+CONTACT_RATE_LIMITS = {
+    'global': config('CONTACT_RATE_GLOBAL', default='30/60'),
+    'ip': config('CONTACT_RATE_IP', default='5/600'),
+    'email': config('CONTACT_RATE_EMAIL', default='3/3600'),
+}
+# Number of reverse proxies in front of the app (Railway adds one)
+RATELIMIT_PROXY_COUNT = config('RATELIMIT_PROXY_COUNT', default=1, cast=int)
+
+
+# Metrics
+# /metrics is served to staff users or to requests carrying
+# "Authorization: Bearer <METRICS_TOKEN>". With METRICS_MULTIPROC_DIR set,
+# every gunicorn worker writes its counters there and a scrape sums them;
+# exited workers' counters are folded into metrics_archived.json.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=float)
+
+
+# Request profiler
+# Staff can profile a single request with "X-Profile: sample|cprofile" or
+# "?_profile=sample|cprofile". PROFILER_SAMPLE_EVERY=N also stack-samples
+# one in every N requests per worker (0 disables it), keeping the newest
+# PROFILER_RING_SIZE profiles; each worker trims older ones after every
+# PROFILER_TRIM_EVERY samples it stores. Results are viewable in the admin.
+PROFILER_SAMPLE_EVERY = config('PROFILER_SAMPLE_EVERY', default=0, cast=int)
+PROFILER_SAMPLE_INTERVAL = config('PROFILER_SAMPLE_INTERVAL', default=0.001, cast=float)
+PROFILER_RING_SIZE = config('PROFILER_RING_SIZE', default=200, cast=int)
+PROFILER_TRIM_EVERY = config('PROFILER_TRIM_EVERY', default=20, cast=int)
+PROFILER_TOP_N = config('PROFILER_TOP_N', default=30, cast=int)
+
+
+# Public pages are sent without cookies and marked
+# "Cache-Control: public, max-age=0, s-maxage=<PUBLIC_CACHE_SECONDS>" so a
+# CDN or proxy can serve them; 0 turns the header off.
+PUBLIC_CACHE_SECONDS = config('PUBLIC_CACHE_SECONDS', default=300, cast=int)
+
+
+# Purging downstream caches (see portfolio/purge.py)
+# Public pages carry Surrogate-Key/Cache-Tag headers. When content changes,
+# the affected keys are POSTed as {"keys": [...]} to PURGE_URL, batched and
+# debounced. Try it locally with "python manage.py purge_server".
+PURGE_URL = config('PURGE_URL', default='')
+PURGE_TOKEN = config('PURGE_TOKEN', default='')
+PURGE_DEBOUNCE = config('PURGE_DEBOUNCE', default=1.0, cast=float)
+PURGE_BATCH_SIZE = config('PURGE_BATCH_SIZE', default=100, cast=int)
+PURGE_TIMEOUT = config('PURGE_TIMEOUT', default=5.0, cast=float)
+
+
+# Response compression (see portfolio/compression.py)
+# Brotli is used when the optional "brotli" package is installed. Each
+# worker keeps up to COMPRESSION_CACHE_BYTES of compressed bodies so
+# unchanged pages aren't compressed again (0 disables the cache).
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+COMPRESSION_MIN_LENGTH = config('COMPRESSION_MIN_LENGTH', default=200, cast=int)
+COMPRESSION_CACHE_BYTES = config('COMPRESSION_CACHE_BYTES', default=8 * 1024 * 1024, cast=int)
+
+
+# Portfolios (tenants)
+# Each Profile is served on its own domain, which must also be listed in
+# ALLOWED_HOSTS; every other allowed host shows the default portfolio.
+# Workers refresh their host map every TENANT_CACHE_TTL seconds.
+TENANT_CACHE_TTL = config('TENANT_CACHE_TTL', default=60, cast=int)
+
+
+# Deferred media deletion (see portfolio/cleanup.py)
+# Replaced and deleted uploads are queued and removed later by
+# "python manage.py delete_pending_files" (run it from a cron job), in
+# batches of FILE_DELETE_BATCH_SIZE. Failed deletes back off exponentially
+# and are given up after FILE_DELETE_MAX_ATTEMPTS tries.
+FILE_DELETE_BATCH_SIZE = config('FILE_DELETE_BATCH_SIZE', default=100, cast=int)
+FILE_DELETE_MAX_ATTEMPTS = config('FILE_DELETE_MAX_ATTEMPTS', default=5, cast=int)
+
+
+# Read-only snapshot (see portfolio/snapshot.py)
+# "python manage.py build_snapshot" writes the public content to
+# SNAPSHOT_PATH. With SNAPSHOT_MODE on, the home, projects and project pages
+# are served from that file without database queries, e.g. while the
+# database is down; edits only show once the snapshot is rebuilt. Workers
+# check for a rebuilt file every SNAPSHOT_CHECK_INTERVAL seconds.
+SNAPSHOT_MODE = config('SNAPSHOT_MODE', default=False, cast=bool)
+SNAPSHOT_PATH = config('SNAPSHOT_PATH', default=str(BASE_DIR / 'snapshot.bin'))
+SNAPSHOT_CHECK_INTERVAL = config('SNAPSHOT_CHECK_INTERVAL', default=2.0, cast=float)
+
+
+# Admin changelists of large tables (contact messages, content blocks) show
+# PostgreSQL's row estimate instead of running COUNT(*) once an unfiltered
+# table holds at least this many rows.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=10000, cast=int)
+
+
 # Security settings for production
 if not DEBUG:
     # Trust Railway's proxy headers for HTTPS
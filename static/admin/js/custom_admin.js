@@ -24,9 +24,10 @@
                 const authorRow = inline.querySelector('.field-quote_author');
                 const codeRow = inline.querySelector('.field-code_content');
                 const langRow = inline.querySelector('.field-code_language');
+                const markdownRow = inline.querySelector('.field-markdown_source');
                 
                 // Hide all
-                [textRow, imageRow, captionRow, quoteRow, authorRow, codeRow, langRow].forEach(row => {
+                [textRow, imageRow, captionRow, quoteRow, authorRow, codeRow, langRow, markdownRow].forEach(row => {
                     if (row) row.style.display = 'none';
                 });
                 
@@ -46,6 +47,9 @@
                     if (codeRow) codeRow.style.display = 'block';
                     if (langRow) langRow.style.display = 'block';
                 }
+                else if (contentType === 'markdown' && markdownRow) {
+                    markdownRow.style.display = 'block';
+                }
             }
             
             // Run on load
@@ -66,5 +70,82 @@
                 }
             });
         });
+        
+        // Drag-and-drop reordering of saved content blocks
+        const group = document.getElementById('content_blocks-group');
+        const changeMatch = window.location.pathname.match(/^(.*\/)change\/$/);
+        if (group && changeMatch) {
+            const reorderUrl = changeMatch[1] + 'reorder-content/';
+            const csrfInput = document.querySelector('input[name="csrfmiddlewaretoken"]');
+            let dragged = null;
+            
+            function savedBlocks() {
+                return Array.from(group.querySelectorAll('.inline-related.has_original'));
+            }
+            
+            function blockId(inline) {
+                const idInput = inline.querySelector('input[name$="-id"]');
+                return idInput ? idInput.value : null;
+            }
+            
+            function saveOrder() {
+                const blocks = savedBlocks().map(blockId).filter(Boolean);
+                fetch(reorderUrl, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': csrfInput ? csrfInput.value : '',
+                    },
+                    credentials: 'same-origin',
+                    body: JSON.stringify({blocks: blocks}),
+                })
+                    .then(response => response.json())
+                    .then(data => {
+                        if (!data.orders) {
+                            alert(data.error || 'Could not save the new order.');
+                            return;
+                        }
+                        // Keep the form in sync so a later "Save" doesn't undo the reorder
+                        savedBlocks().forEach(function(inline) {
+                            const orderInput = inline.querySelector('input[name$="-order"]');
+                            const order = data.orders[blockId(inline)];
+                            if (orderInput && order !== undefined) {
+                                orderInput.value = order;
+                                orderInput.defaultValue = order;
+                            }
+                        });
+                    });
+            }
+            
+            savedBlocks().forEach(function(inline) {
+                const handle = inline.querySelector('h3');
+                if (handle) {
+                    handle.classList.add('drag-handle');
+                    handle.setAttribute('draggable', 'true');
+                    handle.addEventListener('dragstart', function(e) {
+                        dragged = inline;
+                        inline.classList.add('dragging');
+                        e.dataTransfer.effectAllowed = 'move';
+                    });
+                    handle.addEventListener('dragend', function() {
+                        inline.classList.remove('dragging');
+                        dragged = null;
+                    });
+                }
+                
+                inline.addEventListener('dragover', function(e) {
+                    if (!dragged || dragged === inline) return;
+                    e.preventDefault();
+                    const rect = inline.getBoundingClientRect();
+                    const after = e.clientY > rect.top + rect.height / 2;
+                    inline.parentNode.insertBefore(dragged, after ? inline.nextSibling : inline);
+                });
+                
+                inline.addEventListener('drop', function(e) {
+                    e.preventDefault();
+                    saveOrder();
+                });
+            });
+        }
     });
 })();
\ No newline at end of file
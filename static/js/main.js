@@ -140,6 +140,8 @@ class ScrollAnimations {
 class FormHandler {
   constructor() {
     this.form = document.querySelector('.contact-form form');
+    this.status = document.querySelector('.contact-form .form-status');
+    this.csrfToken = null;
     this.init();
   }
 
@@ -184,9 +186,72 @@ class FormHandler {
     return re.test(email);
   }
 
-  handleSubmit(e) {
-    // Let Django handle the form submission
-    // This is just for client-side feedback
+  async getCsrfToken() {
+    // Fetched on first submit so the page itself never sets a cookie
+    if (!this.csrfToken) {
+      const response = await fetch(this.form.action, { credentials: 'same-origin' });
+      const data = await response.json();
+      this.csrfToken = data.csrfToken;
+    }
+    return this.csrfToken;
+  }
+
+  showStatus(message, type) {
+    if (!this.status) return;
+    this.status.innerHTML = '';
+    const alert = document.createElement('div');
+    alert.className = `alert alert-${type}`;
+    alert.textContent = message;
+    this.status.appendChild(alert);
+  }
+
+  showErrors(errors) {
+    const messages = [];
+    Object.entries(errors).forEach(([name, fieldErrors]) => {
+      const field = this.form.elements[name];
+      if (field) {
+        field.style.borderColor = '#ff6b6b';
+        field.style.boxShadow = '0 0 0 3px rgba(255, 107, 107, 0.15)';
+      }
+      fieldErrors.forEach(error => messages.push(error.message));
+    });
+    this.showStatus(messages.join(' ') || 'Please check the form and try again.', 'error');
+  }
+
+  async handleSubmit(e) {
+    e.preventDefault();
+    const button = this.form.querySelector('button[type="submit"]');
+    button.disabled = true;
+
+    try {
+      const response = await fetch(this.form.action, {
+        method: 'POST',
+        body: new FormData(this.form),
+        credentials: 'same-origin',
+        headers: { 'X-CSRFToken': await this.getCsrfToken() },
+      });
+
+      if (response.status === 429) {
+        this.showStatus('Too many messages. Please try again later.', 'error');
+      } else if (response.status === 403) {
+        // Token expired or cookie cleared; fetch a fresh one next time
+        this.csrfToken = null;
+        this.showStatus('Your session expired. Please send the message again.', 'error');
+      } else {
+        const data = await response.json();
+        if (data.ok) {
+          this.form.reset();
+          this.showStatus(data.message, 'success');
+        } else {
+          this.showErrors(data.errors || {});
+        }
+      }
+    } catch (error) {
+      console.error('Failed to send message:', error);
+      this.showStatus('Could not send your message. Please try again.', 'error');
+    } finally {
+      button.disabled = false;
+    }
   }
 }
 
@@ -246,6 +311,76 @@ class CodeHighlight {
   }
 }
 
+// ========================================
+// LAZY CONTENT BLOCKS
+// ========================================
+
+class LazyContentLoader {
+  constructor() {
+    this.observer = null;
+    this.init();
+  }
+
+  init() {
+    if (!('IntersectionObserver' in window)) {
+      // No observer support: load everything straight away
+      this.loadAll();
+      return;
+    }
+
+    this.observer = new IntersectionObserver((entries) => {
+      entries.forEach(entry => {
+        if (entry.isIntersecting) {
+          this.observer.unobserve(entry.target);
+          this.load(entry.target);
+        }
+      });
+    }, { rootMargin: '0px 0px 600px 0px' });
+
+    this.observeSentinels(document);
+  }
+
+  observeSentinels(root) {
+    root.querySelectorAll('.content-sentinel').forEach(sentinel => {
+      if (this.observer) {
+        this.observer.observe(sentinel);
+      }
+    });
+  }
+
+  async load(sentinel) {
+    try {
+      const response = await fetch(sentinel.dataset.src, { credentials: 'same-origin' });
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+      const template = document.createElement('template');
+      template.innerHTML = await response.text();
+      const fragment = template.content;
+
+      if (typeof hljs !== 'undefined') {
+        fragment.querySelectorAll('pre code').forEach(block => hljs.highlightElement(block));
+      }
+      const container = document.createElement('div');
+      container.appendChild(fragment);
+      sentinel.replaceWith(...container.childNodes);
+      this.observeSentinels(document);
+      return true;
+    } catch (error) {
+      sentinel.removeAttribute('aria-busy');
+      console.error('Failed to load more content:', error);
+      return false;
+    }
+  }
+
+  async loadAll() {
+    let sentinel = document.querySelector('.content-sentinel');
+    while (sentinel && await this.load(sentinel)) {
+      sentinel = document.querySelector('.content-sentinel');
+    }
+  }
+}
+
 // ========================================
 // SMOOTH SCROLL
 // ========================================
@@ -302,6 +437,7 @@ document.addEventListener('DOMContentLoaded', () => {
   new FormHandler();
   new SkillAnimation();
   new CodeHighlight();
+  new LazyContentLoader();
   new SmoothScroll();
 
   console.log('✨ Portfolio initialized successfully!');
@@ -353,4 +489,17 @@ if ('IntersectionObserver' in window) {
   });
 
   images.forEach(img => imageObserver.observe(img));
-}
\ No newline at end of file
+}
+
+// ========================================
+// SERVICE WORKER
+// ========================================
+
+// Caches assets and visited pages for repeat and offline visits
+if ('serviceWorker' in navigator) {
+  window.addEventListener('load', () => {
+    navigator.serviceWorker.register('/sw.js').catch((error) => {
+      console.warn('Service worker registration failed:', error);
+    });
+  });
+}
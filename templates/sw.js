@@ -0,0 +1,128 @@
+// ========================================
+// PORTFOLIO SERVICE WORKER
+// Generated by collectstatic from templates/sw.js; edit the template
+// ========================================
+
+const VERSION = '{{ version }}';
+const PRECACHE = `portfolio-static-${VERSION}`;
+const PAGES = `portfolio-pages-${VERSION}`;
+const ASSETS = 'portfolio-assets';
+const CACHES = [PRECACHE, PAGES, ASSETS];
+
+const PRECACHE_URLS = {{ precache_urls|safe }};
+const OFFLINE_URL = '{{ offline_url }}';
+const NETWORK_ONLY = {{ network_only|safe }};
+const MAX_PAGES = 30;
+const MAX_ASSETS = 80;
+
+const precached = new Set(PRECACHE_URLS);
+
+// ========================================
+// LIFECYCLE
+// ========================================
+
+self.addEventListener('install', (event) => {
+  event.waitUntil(
+    Promise.all([
+      caches.open(PRECACHE).then((cache) => cache.addAll(PRECACHE_URLS)),
+      caches.open(PAGES).then((cache) => cache.add(OFFLINE_URL)),
+    ]).then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener('activate', (event) => {
+  // Drop the caches of previous deploys
+  event.waitUntil(
+    caches.keys()
+      .then((names) => Promise.all(
+        names
+          .filter((name) => name.startsWith('portfolio-') && !CACHES.includes(name))
+          .map((name) => caches.delete(name))
+      ))
+      .then(() => self.clients.claim())
+  );
+});
+
+// ========================================
+// STRATEGIES
+// ========================================
+
+async function trim(cache, max) {
+  const keys = await cache.keys();
+  await Promise.all(keys.slice(0, Math.max(keys.length - max, 0)).map((key) => cache.delete(key)));
+}
+
+// Caching is best effort: a failed write (e.g. quota exceeded) must not cost the response
+async function store(cache, request, response, max) {
+  try {
+    await cache.put(request, response);
+    await trim(cache, max);
+  } catch (error) {
+    console.warn('Service worker could not cache', request.url, error);
+  }
+}
+
+function isShareable(response) {
+  const cacheControl = response.headers.get('Cache-Control') || '';
+  return response.ok && !/private|no-store/.test(cacheControl);
+}
+
+// Pages: always try the network, fall back to the last copy, then the offline page
+async function networkFirst(request) {
+  const cache = await caches.open(PAGES);
+  let response;
+  try {
+    response = await fetch(request);
+  } catch (error) {
+    return (await cache.match(request)) || (await cache.match(OFFLINE_URL)) || Response.error();
+  }
+  if (isShareable(response)) {
+    await store(cache, request, response.clone(), MAX_PAGES);
+  }
+  return response;
+}
+
+// Hashed assets never change, so the precached copy is always right
+async function cacheFirst(request) {
+  const cached = await caches.match(request, { cacheName: PRECACHE });
+  return cached || fetch(request);
+}
+
+// Images and CDN fonts/styles: answer from cache, refresh it in the background
+async function staleWhileRevalidate(event, request) {
+  const cache = await caches.open(ASSETS);
+  const cached = await cache.match(request);
+  const refresh = fetch(request).then(async (response) => {
+    if (response.ok || response.type === 'opaque') {
+      await store(cache, request, response.clone(), MAX_ASSETS);
+    }
+    return response;
+  });
+
+  if (cached) {
+    event.waitUntil(refresh.catch(() => {}));
+    return cached;
+  }
+  return refresh;
+}
+
+self.addEventListener('fetch', (event) => {
+  const { request } = event;
+  if (request.method !== 'GET') {
+    return;
+  }
+
+  const url = new URL(request.url);
+  const sameOrigin = url.origin === self.location.origin;
+  if (sameOrigin && NETWORK_ONLY.some((prefix) => url.pathname.startsWith(prefix))) {
+    return;
+  }
+
+  if (request.mode === 'navigate') {
+    event.respondWith(networkFirst(request));
+  } else if (sameOrigin && precached.has(url.pathname)) {
+    event.respondWith(cacheFirst(request));
+  } else if (['image', 'font', 'style'].includes(request.destination)) {
+    event.respondWith(staleWhileRevalidate(event, request));
+  }
+});